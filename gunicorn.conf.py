@@ -0,0 +1,5 @@
+from habit_tracker.metrics import mark_process_dead
+
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
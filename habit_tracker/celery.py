@@ -1,9 +1,18 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_shutdown, worker_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "habit_tracker.settings")
 
 app = Celery("habit_tracker")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def clear_process_metrics(pid=None, **kwargs):
+    from .metrics import mark_process_dead
+
+    mark_process_dead(pid or os.getpid())
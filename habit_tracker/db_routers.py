@@ -0,0 +1,131 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_replica_health = {"ok": True, "checked_at": float("-inf")}
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_available():
+    """Проверяет реплику не чаще раза в REPLICA_HEALTH_INTERVAL секунд."""
+    now = time.monotonic()
+    if now - _replica_health["checked_at"] < settings.REPLICA_HEALTH_INTERVAL:
+        return _replica_health["ok"]
+    replica = connections[REPLICA]
+    try:
+        with replica.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        ok = True
+    except DatabaseError as e:
+        logger.warning("Replica is unavailable, reading from primary: %s", e)
+        replica.close()
+        ok = False
+    _replica_health.update(ok=ok, checked_at=now)
+    return ok
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Разрешает (или запрещает) чтение с реплики внутри блока."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Роутер: запись всегда в default, чтение — с реплики, если это разрешено
+    для текущего запроса и реплика доступна.
+
+    По умолчанию (фоновые задачи, команды) чтение идёт с primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured() and replica_available():
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def pin_key(user_id):
+    return f"db:pin-primary:{user_id}"
+
+
+def request_user_id(request):
+    """ID пользователя из JWT без обращения к базе (или из сессии)."""
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is not None:
+        raw_token = authenticator.get_raw_token(header)
+        if raw_token is not None:
+            try:
+                token = authenticator.get_validated_token(raw_token)
+            except (InvalidToken, TokenError):
+                return None
+            return token.get(api_settings.USER_ID_CLAIM)
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return request.session.get("_auth_user_id")
+    return None
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтение безопасных запросов (GET, HEAD, OPTIONS) на реплику.
+
+    После успешного изменяющего запроса пользователь на REPLICA_PIN_SECONDS
+    закрепляется за primary (метка в общем кэше), чтобы сразу видеть свои
+    изменения. При недоступности кэша чтение идёт с primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        user_id = request_user_id(request)
+        safe = request.method in SAFE_METHODS
+        with replica_reads(safe and not self.is_pinned(user_id)):
+            response = self.get_response(request)
+
+        if not safe and user_id is not None and response.status_code < 400:
+            try:
+                cache.set(pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+            except Exception as e:
+                logger.warning("Could not pin user %s to primary: %s", user_id, e)
+        return response
+
+    def is_pinned(self, user_id):
+        if user_id is None:
+            return False
+        try:
+            return bool(cache.get(pin_key(user_id)))
+        except Exception as e:
+            logger.warning("Could not read primary pin for %s: %s", user_id, e)
+            return True
@@ -0,0 +1,86 @@
+import glob
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса.",
+    ["method", "view"],
+)
+REQUESTS = Counter(
+    "http_requests",
+    "HTTP-запросы по представлению и коду ответа.",
+    ["method", "view", "status"],
+)
+
+
+class ServicesCollector(multiprocess.MultiProcessCollector):
+    """Метрики всех сервисов: файлы из подкаталогов PROMETHEUS_METRICS_ROOT."""
+
+    def collect(self):
+        files = glob.glob(os.path.join(self._path, "*", "*.db"))
+        return self.merge(files, accumulate=True)
+
+
+def get_registry():
+    """Реестр метрик; в многопроцессном режиме собирает файлы всех процессов.
+
+    Многопроцессный режим включается переменной PROMETHEUS_MULTIPROC_DIR.
+    Если задан PROMETHEUS_METRICS_ROOT (см. prometheus-exec.sh), у каждого
+    сервиса свой подкаталог, а собираются файлы всех сервисов.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    root = os.environ.get("PROMETHEUS_METRICS_ROOT")
+    if root:
+        ServicesCollector(registry, root)
+    else:
+        multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead(pid):
+    """Удаляет live-метрики завершившегося процесса."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def metrics_view(request):
+    """Отдаёт метрики в текстовом формате Prometheus.
+
+    Если задан METRICS_TOKEN, требуется заголовок Authorization: Bearer <token>.
+    """
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
+
+
+class PrometheusMiddleware:
+    """Middleware, считающий запросы и их длительность по имени маршрута."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        REQUEST_LATENCY.labels(request.method, view).observe(
+            time.perf_counter() - started
+        )
+        REQUESTS.labels(request.method, view, response.status_code).inc()
+        return response
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.shortcuts import render
+from django.urls import reverse
+
+from .timing import record_cache
+
+SCHEMA_INFO = {
+    "title": "Habit Tracker API",
+    "default_version": "v1",
+    "description": "Документация для Habit Tracker",
+    "terms_of_service": "https://www.google.com/policies/terms/",
+    "contact_email": "your_email@example.com",
+    "license_name": "BSD License",
+}
+
+SOURCE_DIRS = ("habit_tracker", "habits", "users")
+
+_schema = None
+_schema_lock = threading.Lock()
+
+
+def generate_schema():
+    """Строит OpenAPI-схему через drf_yasg и возвращает её в виде JSON (bytes).
+
+    drf_yasg импортируется только здесь, поэтому обычные запросы к API
+    и старт воркеров его не загружают.
+    """
+    from drf_yasg import openapi
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    info = openapi.Info(
+        title=SCHEMA_INFO["title"],
+        default_version=SCHEMA_INFO["default_version"],
+        description=SCHEMA_INFO["description"],
+        terms_of_service=SCHEMA_INFO["terms_of_service"],
+        contact=openapi.Contact(email=SCHEMA_INFO["contact_email"]),
+        license=openapi.License(name=SCHEMA_INFO["license_name"]),
+    )
+    schema = OpenAPISchemaGenerator(info).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def source_mtime():
+    """Время последнего изменения кода, из которого строится схема."""
+    base = Path(settings.BASE_DIR)
+    return max(
+        (
+            path.stat().st_mtime
+            for name in SOURCE_DIRS
+            for path in (base / name).rglob("*.py")
+        ),
+        default=0,
+    )
+
+
+def prebuilt_schema():
+    """Схема из OPENAPI_SCHEMA_PATH или None.
+
+    С DEBUG файл используется, только если он новее кода: при разработке
+    схема из старой сборки иначе оставалась бы в силе бесконечно.
+    """
+    path = Path(settings.OPENAPI_SCHEMA_PATH)
+    if not path.is_file():
+        return None
+    if settings.DEBUG and path.stat().st_mtime < source_mtime():
+        return None
+    return path.read_bytes()
+
+
+def get_schema():
+    """Возвращает (json, etag): из файла, собранного при сборке, или построив схему
+    один раз на процесс."""
+    global _schema
+    if _schema is not None:
+        record_cache(hit=True)
+        return _schema
+
+    record_cache(hit=False)
+    with _schema_lock:
+        if _schema is None:
+            content = prebuilt_schema() or generate_schema()
+            _schema = content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    return _schema
+
+
+def schema_json(request):
+    """Отдаёт OpenAPI-схему с ETag и поддержкой If-None-Match."""
+    content, etag = get_schema()
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=300"
+    return response
+
+
+def swagger_ui(request):
+    return render(
+        request,
+        "openapi/swagger.html",
+        {"title": SCHEMA_INFO["title"], "schema_url": reverse("schema-json")},
+    )
+
+
+def redoc_ui(request):
+    return render(
+        request,
+        "openapi/redoc.html",
+        {"title": SCHEMA_INFO["title"], "schema_url": reverse("schema-json")},
+    )
@@ -0,0 +1,52 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой числа строк вместо COUNT(*) на больших таблицах.
+
+    В PostgreSQL без фильтров число строк берётся из pg_class.reltuples
+    (сумма по секциям секционированной таблицы), с фильтрами — из оценки
+    планировщика (EXPLAIN). Если оценка меньше exact_threshold, её нет
+    или база не PostgreSQL, выполняется обычный COUNT(*).
+    """
+
+    exact_threshold = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, "query", None) is None:
+            return super().count
+        if connections[queryset.db].vendor != "postgresql":
+            return super().count
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < self.exact_threshold:
+            return super().count
+        return estimate
+
+    def estimate(self, queryset):
+        if queryset.query.where:
+            plan = json.loads(queryset.explain(format="json"))[0]["Plan"]
+            return int(plan["Plan Rows"])
+        with connections[queryset.db].cursor() as cursor:
+            # Секции, которые ещё не анализировались, имеют reltuples = -1:
+            # тогда оценке верить нельзя.
+            cursor.execute(
+                """
+                SELECT SUM(reltuples) FILTER (WHERE reltuples >= 0),
+                       COUNT(*) FILTER (WHERE reltuples < 0)
+                FROM pg_class
+                WHERE oid IN (
+                    SELECT relid FROM pg_partition_tree(%s::regclass) WHERE isleaf
+                )
+                """,
+                [queryset.model._meta.db_table],
+            )
+            total, unanalyzed = cursor.fetchone()
+        if total is None or unanalyzed:
+            return None
+        return int(total)
@@ -0,0 +1,157 @@
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "__profile"
+PROFILE_SUFFIX = ".folded"
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.folded$")
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер одного потока.
+
+    Фоновый поток с заданным интервалом снимает стек целевого потока
+    через sys._current_frames() и копит свёрнутые стеки (collapsed stacks),
+    которые открываются в speedscope и flamegraph.pl.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def store_profile(request, profiler):
+    """Сохраняет профиль в кольцевой буфер и возвращает имя файла."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^\w-]+", "-", request.path).strip("-") or "root"
+    name = (
+        f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{slug[:60]}-"
+        f"{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+    )
+    (directory / name).write_text(profiler.collapsed())
+
+    older = sorted(
+        (path for path in directory.glob(f"*{PROFILE_SUFFIX}") if path.name != name),
+        key=os.path.getmtime,
+    )
+    keep = max(settings.PROFILE_MAX_FILES - 1, 0)
+    for stale in older[: len(older) - keep]:
+        stale.unlink(missing_ok=True)
+    return name
+
+
+def is_profiling_requested(request):
+    header = request.headers.get(PROFILE_HEADER)
+    return header == "1" or request.GET.get(PROFILE_QUERY_PARAM) == "1"
+
+
+def is_staff_request(request):
+    """Проверяет JWT (или сессию) запроса и права сотрудника."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return bool(result and result[0].is_staff)
+
+
+class ProfilingMiddleware:
+    """Профилирует отдельный запрос по заголовку X-Profile: 1 или ?__profile=1.
+
+    Доступно только сотрудникам; остальные запросы обрабатываются как обычно.
+    Имя сохранённого профиля возвращается в заголовке X-Profile-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_profiling_requested(request) or not is_staff_request(request):
+            return self.get_response(request)
+
+        with SamplingProfiler(settings.PROFILE_SAMPLE_INTERVAL) as profiler:
+            response = self.get_response(request)
+        response["X-Profile-Id"] = store_profile(request, profiler)
+        return response
+
+
+@staff_member_required
+def profile_list(request):
+    """Список сохранённых профилей для админки."""
+    profiles = [
+        {
+            "name": path.name,
+            "size": path.stat().st_size,
+            "created": time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(path.stat().st_mtime)
+            ),
+        }
+        for path in sorted(
+            profile_dir().glob(f"*{PROFILE_SUFFIX}"),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+    ]
+    return render(
+        request,
+        "admin/profiles.html",
+        {"title": "Профили запросов", "profiles": profiles},
+    )
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Скачивание профиля в формате collapsed stacks."""
+    path = profile_dir() / name
+    if not PROFILE_NAME_RE.match(name) or not path.is_file():
+        raise Http404("Profile not found")
+    return FileResponse(path.open("rb"), as_attachment=True, filename=name)
@@ -0,0 +1,230 @@
+import gzip
+import hashlib
+import logging
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from .timing import record_cache
+
+try:
+    import brotli
+except ImportError:  # без brotli хранятся только identity и gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 9
+# Сжатие выполняется один раз на промах, но в запросе: 11 для JSON
+# в сотни килобайт занимает секунды, 5 уже заметно лучше gzip.
+BROTLI_QUALITY = 5
+STORED_HEADERS = ("Content-Type", "Content-Language", "Cache-Control", "ETag", "Vary")
+
+
+def encodings():
+    return ("br", "gzip") if brotli else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """Лучшее из доступных кодирований, принимаемых клиентом (с учётом q=0)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def version_key(group):
+    return f"respcache:version:{group}"
+
+
+def new_version():
+    """Начальная версия группы.
+
+    Случайная, а не 0: если ключ версии вытеснен из кэша, новая версия не
+    совпадёт с прежними, и записи, сохранённые до вытеснения, не читаются.
+    """
+    return secrets.randbits(62)
+
+
+def current_version(group):
+    """Версия группы; ключ заводится при первом чтении или после вытеснения.
+
+    Возвращает:
+        int | None: Версия или None, если кэш её не сохранил.
+    """
+    key = version_key(group)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(group):
+    """Делает недействительными закэшированные ответы группы.
+
+    Старые записи не удаляются — они перестают читаться и истекают по
+    RESPONSE_CACHE_TIMEOUT.
+    """
+    key = version_key(group)
+    try:
+        cache.add(key, new_version(), None)
+        cache.incr(key)
+    except Exception as e:
+        logger.warning("Could not bump response cache version %s: %s", group, e)
+
+
+def weak_etag(etag):
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def build_variants(response):
+    """Тело ответа без сжатия, в gzip и (если установлен) brotli.
+
+    Возвращает:
+        dict: Кодирование -> (Content-Encoding, заголовки, тело). Короткие
+        тела не сжимаются: под всеми кодированиями лежит identity.
+    """
+    headers = {
+        name: response[name] for name in STORED_HEADERS if response.has_header(name)
+    }
+    body = response.content
+    identity = ("", headers, body)
+    variants = {"identity": identity, **{name: identity for name in encodings()}}
+    if len(body) < settings.RESPONSE_CACHE_MIN_SIZE:
+        return variants
+
+    compressed_headers = dict(headers)
+    if "ETag" in headers:
+        compressed_headers["ETag"] = weak_etag(headers["ETag"])
+    variants["gzip"] = (
+        "gzip",
+        compressed_headers,
+        gzip.compress(body, GZIP_LEVEL, mtime=0),
+    )
+    if brotli:
+        variants["br"] = (
+            "br",
+            compressed_headers,
+            brotli.compress(body, quality=BROTLI_QUALITY),
+        )
+    return variants
+
+
+def replay(request, entry):
+    content_encoding, headers, body = entry
+    etag = headers.get("ETag")
+    if etag and etag.removeprefix("W/") in [
+        tag.removeprefix("W/")
+        for tag in parse_etags(request.headers.get("If-None-Match", ""))
+    ]:
+        response = HttpResponseNotModified()
+        headers = {
+            name: value
+            for name, value in headers.items()
+            if name not in ("Content-Type", "Content-Language")
+        }
+    else:
+        response = HttpResponse(body)
+        if content_encoding:
+            response["Content-Encoding"] = content_encoding
+    for name, value in headers.items():
+        response[name] = value
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+class ResponseCacheMiddleware:
+    """Кэш готовых ответов на анонимные GET для представлений из RESPONSE_CACHE_VIEWS.
+
+    Тело хранится сразу в нескольких кодированиях, и попадание отдаётся
+    без сжатия на лету. Ключ — URL, Accept, выбранное кодирование и версия
+    группы данных; версию повышает bump() из сигналов моделей. При ошибке
+    кэша запрос обрабатывается как обычно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        group = self.cached_group(request)
+        if group is False:
+            return self.get_response(request)
+
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        try:
+            prefix = self.key_prefix(request, group)
+            if prefix is None:
+                return self.get_response(request)
+            entry = cache.get(f"{prefix}:{encoding}")
+        except Exception as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return self.get_response(request)
+        record_cache(hit=entry is not None)
+        if entry is not None:
+            return replay(request, entry)
+
+        response = self.get_response(request)
+        if not self.cacheable(request, response):
+            return response
+        variants = build_variants(response)
+        try:
+            cache.set_many(
+                {f"{prefix}:{name}": entry for name, entry in variants.items()},
+                settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning("Could not store response for %s: %s", request.path, e)
+        return replay(request, variants[encoding])
+
+    def cached_group(self, request):
+        """Группа данных представления; False — ответ не кэшируется."""
+        if request.method != "GET" or "Authorization" in request.headers:
+            return False
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return settings.RESPONSE_CACHE_VIEWS.get(match.url_name, False)
+
+    def key_prefix(self, request, group):
+        """Префикс ключей ответа; None — версия группы недоступна."""
+        version = current_version(group) if group else 0
+        if version is None:
+            return None
+        source = "\n".join([request.get_full_path(), request.headers.get("Accept", "")])
+        digest = hashlib.sha256(source.encode()).hexdigest()[:32]
+        return f"respcache:{group or '-'}:{version}:{digest}"
+
+    def cacheable(self, request, response):
+        if response.status_code != 200 or response.streaming or response.cookies:
+            return False
+        if response.has_header("Content-Encoding"):
+            return False
+        cache_control = response.get("Cache-Control", "")
+        if any(word in cache_control for word in ("private", "no-store", "no-cache")):
+            return False
+        # Ответ, который записал что-то в сессию или выдал CSRF-токен,
+        # получит cookie снаружи этого middleware и уже не будет общим.
+        session = getattr(request, "session", None)
+        if session is not None and session.modified:
+            return False
+        return not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
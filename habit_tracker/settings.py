@@ -2,7 +2,9 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
+from kombu import Queue
 
 load_dotenv()
 
@@ -21,6 +23,8 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # Только ради статики Swagger UI и ReDoc; сам drf_yasg импортируется
+    # лишь при построении схемы (habit_tracker.openapi).
     "drf_yasg",
     "rest_framework",
     "corsheaders",
@@ -29,14 +33,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "habit_tracker.timing.ServerTimingMiddleware",
+    "habit_tracker.metrics.PrometheusMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "habit_tracker.db_routers.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "habit_tracker.response_cache.ResponseCacheMiddleware",
+    "habit_tracker.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "habit_tracker.urls"
@@ -45,7 +54,7 @@ WSGI_APPLICATION = "habit_tracker.wsgi.application"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
+        "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -69,6 +78,45 @@ DATABASES = {
     }
 }
 
+# Режим соединений с БД (для gunicorn и Celery одинаковый):
+#   persistent — соединение живёт DB_CONN_MAX_AGE секунд с проверкой перед запросом;
+#   pool — пул psycopg 3 в каждом процессе (DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE),
+#          соединения проверяются при выдаче из пула;
+#   pgbouncer — постоянное соединение с pgbouncer в transaction mode, без
+#   серверных курсоров и подготовленных выражений;
+#   none — новое соединение на каждый запрос.
+DB_CONNECTION_MODE = os.getenv("DB_CONNECTION_MODE", "persistent")
+if DB_CONNECTION_MODE == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_CONNECTION_MODE == "pool":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 4)),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        }
+    }
+elif DB_CONNECTION_MODE == "pgbouncer":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+    DATABASES["default"]["OPTIONS"] = {"prepare_threshold": None}
+
+# Реплика для чтения: безопасные запросы читают с неё (см. habit_tracker.db_routers).
+# После записи пользователь на REPLICA_PIN_SECONDS закреплён за primary;
+# состояние реплики проверяется не чаще раза в REPLICA_HEALTH_INTERVAL секунд.
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["habit_tracker.db_routers.PrimaryReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", 5))
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -103,6 +151,12 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Загрузки пишутся сразу во временный файл на диске, а не в память.
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+FILE_UPLOAD_TEMP_DIR = os.getenv("FILE_UPLOAD_TEMP_DIR") or None
+AVATAR_THUMBNAIL_SIZES = (64, 256)
+AVATAR_THUMBNAIL_QUALITY = 80
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 SIMPLE_JWT = {
@@ -125,6 +179,8 @@ REDOC_SETTINGS = {
     "LAZY_RENDERING": False,
 }
 
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", BASE_DIR / "openapi.json")
+
 EMAIL_BACKEND = os.getenv(
     "EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend"
 )
@@ -133,13 +189,131 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True") == "True"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "your_email@example.com")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "your_email_password")
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
+
+# Недельная сводка: пользователи обрабатываются пачками, каждая пачка
+# отправляется через одно SMTP-соединение; пачек в минуту на воркер —
+# не больше WEEKLY_DIGEST_RATE_LIMIT.
+WEEKLY_DIGEST_CHUNK_SIZE = int(os.getenv("WEEKLY_DIGEST_CHUNK_SIZE", 200))
+WEEKLY_DIGEST_RATE_LIMIT = os.getenv("WEEKLY_DIGEST_RATE_LIMIT", "30/m")
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Server-Sent Events (habits/events/): интервал keepalive-комментариев
+# и задержка переподключения клиента.
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", 15))
+SSE_RETRY_MS = 5000
 
-CELERY_BROKER_URL = "redis://localhost:6379/0"
+# Дельта-синхронизация (habits/sync/): срок хранения следов удаления
+# и запас токена на транзакции, зафиксированные после ответа.
+SYNC_TOMBSTONE_TTL = timedelta(days=int(os.getenv("SYNC_TOMBSTONE_TTL_DAYS", 30)))
+SYNC_TOKEN_LAG = 5
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_URL", REDIS_URL),
+    }
+}
+
+# Готовые ответы на анонимные GET: имя URL -> группа данных, версию
+# которой повышают сигналы моделей (None — только по истечении срока).
+RESPONSE_CACHE_VIEWS = {
+    "home": None,
+    "public-habits": "habits",
+    "schema-json": None,
+    "schema-swagger-ui": None,
+    "schema-redoc": None,
+}
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300))
+RESPONSE_CACHE_MIN_SIZE = 1024
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 CELERY_ENABLE_UTC = True
 
+# Очереди: reminders — срочные задачи (напоминания, отметки из Telegram),
+# bulk — долгие задачи ввода-вывода (очередь по умолчанию),
+# maintenance — ночное обслуживание. Каждую очередь слушает свой воркер
+# (см. docker-compose.yaml), поэтому долгая задача не задерживает напоминания.
+CELERY_TASK_QUEUES = (
+    Queue("reminders", routing_key="reminders"),
+    Queue("bulk", routing_key="bulk"),
+    Queue("maintenance", routing_key="maintenance"),
+)
+CELERY_TASK_DEFAULT_QUEUE = "bulk"
+CELERY_TASK_ROUTES = {
+    "habits.tasks.dispatch_due_reminders": {"queue": "reminders", "priority": 0},
+    "habits.tasks.send_habit_reminder": {"queue": "reminders", "priority": 3},
+    "habits.tasks.flush_completion_buffer": {"queue": "reminders", "priority": 0},
+    "habits.tasks.reconcile_leaderboard": {"queue": "maintenance"},
+    "habits.tasks.purge_habit_tombstones": {"queue": "maintenance"},
+}
+# Приоритеты в Redis: 0 — наивысший; каждая очередь делится на подочереди
+# по ступеням priority_steps.
+CELERY_TASK_DEFAULT_PRIORITY = 6
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "queue_order_strategy": "priority",
+    "priority_steps": [0, 3, 6, 9],
+    "sep": ":",
+    # Задача с acks_late вернётся в очередь, если не подтверждена за это время.
+    "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", 3600)),
+}
+# Воркер берёт по одной задаче на процесс: короткие задачи не ждут за
+# заранее выбранными долгими.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    "dispatch-habit-reminders": {
+        "task": "habits.tasks.dispatch_due_reminders",
+        "schedule": crontab(),
+        "options": {"expires": 55},
+    },
+    "reconcile-public-leaderboard": {
+        "task": "habits.tasks.reconcile_leaderboard",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "purge-habit-tombstones": {
+        "task": "habits.tasks.purge_habit_tombstones",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "send-weekly-digest": {
+        "task": "habits.tasks.send_weekly_digest",
+        "schedule": crontab(day_of_week="mon", hour=7, minute=0),
+    },
+    "flush-telegram-completions": {
+        "task": "habits.tasks.flush_completion_buffer",
+        "schedule": float(os.getenv("COMPLETION_FLUSH_INTERVAL", 0.5)),
+        "options": {"expires": 5},
+    },
+}
+
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ["Server-Timing"]
+
+# Заголовок Server-Timing получают только сотрудники (или все при DEBUG).
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv("SERVER_TIMING_SAMPLE_RATE", 0))
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", BASE_DIR / "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 50))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.002))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "habit_tracker": {"handlers": ["console"], "level": "INFO"},
+        "habits": {"handlers": ["console"], "level": "INFO"},
+    },
+}
 
 APPEND_SLASH = False
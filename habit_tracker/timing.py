@@ -0,0 +1,138 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from .profiling import is_staff_request
+
+logger = logging.getLogger("habit_tracker.timing")
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: время в БД, сериализаторах и обращения к кэшу."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.query_count = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+
+    def as_dict(self):
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "db_ms": round(self.db_time * 1000, 2),
+            "queries": self.query_count,
+            "serializer_ms": round(self.serializer_time * 1000, 2),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def record_cache(hit):
+    """Учитывает попадание или промах кэша в метриках текущего запроса."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+@contextmanager
+def serializer_timer():
+    """Замеряет время сериализации; вложенные сериализаторы не суммируются."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """Примесь для сериализаторов DRF, учитывающая время to_representation."""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+def server_timing_header(values):
+    return ", ".join(
+        [
+            f"total;dur={values['total_ms']}",
+            f"db;dur={values['db_ms']};desc=\"{values['queries']} queries\"",
+            f"serializer;dur={values['serializer_ms']}",
+            f"cache;desc=\"hit={values['cache_hits']} miss={values['cache_misses']}\"",
+        ]
+    )
+
+
+class ServerTimingMiddleware:
+    """Middleware, выдающий заголовок Server-Timing и структурированный лог.
+
+    Замеряется доля запросов, заданная SERVER_TIMING_SAMPLE_RATE (0..1,
+    по умолчанию 0). Лог пишется для каждого замеренного запроса, а заголовок
+    с временем в БД и попаданиями в кэш получают только сотрудники или все
+    при DEBUG. Запросы к БД считаются через connection.execute_wrapper,
+    поэтому DEBUG для замера не нужен.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 0)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        values = metrics.as_dict()
+        if settings.DEBUG or is_staff_request(request):
+            response["Server-Timing"] = server_timing_header(values)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    **values,
+                }
+            )
+        )
+        return response
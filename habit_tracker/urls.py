@@ -1,37 +1,29 @@
 from django.contrib import admin
 from django.urls import include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
 from habits import views
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Habit Tracker API",
-        default_version="v1",
-        description="Документация для Habit Tracker",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="your_email@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .metrics import metrics_view
+from .openapi import redoc_ui, schema_json, swagger_ui
+from .profiling import profile_download, profile_list
 
 urlpatterns = [
+    path("admin/profiles/", profile_list, name="admin-profiles"),
+    path(
+        "admin/profiles/<str:name>/",
+        profile_download,
+        name="admin-profile-download",
+    ),
     path("admin/", admin.site.urls),
     path("", views.home, name="home"),
+    path("metrics", metrics_view, name="metrics"),
     path("api/", include("habits.urls")),
     path("api/users/", include("users.urls")),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("swagger.json", schema_json, name="schema-json"),
+    path("swagger/", swagger_ui, name="schema-swagger-ui"),
+    path("redoc/", redoc_ui, name="schema-redoc"),
 ]
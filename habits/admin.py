@@ -1,9 +1,34 @@
 from django.contrib import admin
 
+from habit_tracker.paginators import EstimatedCountPaginator
+
 from .models import Habit
 
 
 @admin.register(Habit)
 class HabitAdmin(admin.ModelAdmin):
-    list_display = ("action", "time", "user", "is_public")
-    list_filter = ("is_public", "user")
+    """Список привычек, рассчитанный на десятки миллионов строк.
+
+    Без COUNT(*) по всей таблице, связанные объекты — одним JOIN, внешние
+    ключи — полями для ID вместо выпадающих списков. Фильтр и поиск — только
+    по индексированным условиям: точный ID привычки или email владельца.
+    """
+
+    list_display = ("id", "action", "time", "user", "linked_habit", "is_public")
+    list_select_related = ("user", "linked_habit")
+    list_filter = ("is_public",)
+    raw_id_fields = ("user", "linked_habit", "copied_from")
+    search_fields = ("id", "user__email")
+    search_help_text = "ID привычки или точный email владельца"
+    sortable_by = ("id",)
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        return queryset.filter(user__email=term), False
@@ -0,0 +1,336 @@
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from datetime import time as dt_time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Habit, Profile
+
+logger = logging.getLogger(__name__)
+
+BENCH_EMAIL_PREFIX = "bench-"
+BENCH_PASSWORD = "bench-password-123"
+
+
+class BenchmarkData:
+    """Пользователи, токены и привычки, подготовленные для прогона."""
+
+    def __init__(self, users, habits_by_user, disposable):
+        self.users = users
+        self.habits_by_user = habits_by_user
+        self.disposable = disposable
+        self.tokens = {}
+        self._lock = threading.Lock()
+        for user in users:
+            refresh = RefreshToken.for_user(user)
+            self.tokens[user.pk] = (str(refresh.access_token), str(refresh))
+
+    def random_user(self):
+        return random.choice(self.users)
+
+    def pop_disposable(self):
+        with self._lock:
+            return self.disposable.pop() if self.disposable else None
+
+
+def habit_payload(index, is_public):
+    return {
+        "place": f"Place {index % 50}",
+        "time": dt_time(6 + index % 16, (index * 7) % 60).isoformat(),
+        "action": f"Action {index}",
+        "is_pleasant": False,
+        "frequency": 1 + index % 7,
+        "reward": "Tea" if index % 3 == 0 else None,
+        "duration": 5 + index % 100,
+        "is_public": is_public,
+    }
+
+
+def seed(users, habits_per_user, public_ratio, disposable):
+    """Создаёт набор данных для прогона (с префиксом bench- в email)."""
+    cleanup()
+    User = get_user_model()
+    password = make_password(BENCH_PASSWORD)
+    created_users = User.objects.bulk_create(
+        [
+            User(email=f"{BENCH_EMAIL_PREFIX}{index}@example.com", password=password)
+            for index in range(users)
+        ]
+    )
+    Profile.objects.bulk_create([Profile(user=user) for user in created_users])
+
+    habits = []
+    for user in created_users:
+        for index in range(habits_per_user):
+            habits.append(
+                Habit(
+                    user=user,
+                    **habit_payload(index, random.random() < public_ratio),
+                )
+            )
+    Habit.objects.bulk_create(habits, batch_size=5000)
+
+    habits_by_user = {}
+    for habit_id, user_id in Habit.objects.filter(user__in=created_users).values_list(
+        "pk", "user_id"
+    ):
+        habits_by_user.setdefault(user_id, []).append(habit_id)
+
+    spare = Habit.objects.bulk_create(
+        [
+            Habit(user=random.choice(created_users), **habit_payload(index, False))
+            for index in range(disposable)
+        ]
+    )
+    return BenchmarkData(
+        created_users, habits_by_user, [(h.user_id, h.pk) for h in spare]
+    )
+
+
+def cleanup():
+    get_user_model().objects.filter(email__startswith=BENCH_EMAIL_PREFIX).delete()
+
+
+def auth(data, user):
+    return {"HTTP_AUTHORIZATION": f"Bearer {data.tokens[user.pk][0]}"}
+
+
+def scenario_list(client, data):
+    return client.get(reverse("list-habits"), **auth(data, data.random_user()))
+
+
+def scenario_public(client, data):
+    return client.get(reverse("public-habits"))
+
+
+def scenario_create(client, data):
+    user = data.random_user()
+    return client.post(
+        reverse("create-habit"),
+        json.dumps(habit_payload(random.randint(0, 10_000), False)),
+        content_type="application/json",
+        **auth(data, user),
+    )
+
+
+def scenario_update(client, data):
+    user = data.random_user()
+    habit_id = random.choice(data.habits_by_user[user.pk])
+    return client.patch(
+        reverse("habit-update", args=[habit_id]),
+        # validate() сравнивает frequency даже при частичном обновлении.
+        json.dumps(
+            {"duration": random.randint(1, 120), "frequency": random.randint(1, 7)}
+        ),
+        content_type="application/json",
+        **auth(data, user),
+    )
+
+
+def scenario_delete(client, data):
+    user_id, habit_id = data.pop_disposable()
+    return client.delete(
+        reverse("habit-delete", args=[habit_id]),
+        HTTP_AUTHORIZATION=f"Bearer {data.tokens[user_id][0]}",
+    )
+
+
+def scenario_token(client, data):
+    return client.post(
+        reverse("token_obtain_pair"),
+        {"email": data.random_user().email, "password": BENCH_PASSWORD},
+    )
+
+
+def scenario_refresh(client, data):
+    user = data.random_user()
+    return client.post(reverse("token_refresh"), {"refresh": data.tokens[user.pk][1]})
+
+
+def scenario_profile(client, data):
+    return client.get(reverse("user-profile"), **auth(data, data.random_user()))
+
+
+def scenario_db_roundtrip(client, data):
+    """Жизненный цикл запроса с одним SELECT 1 без тестового клиента.
+
+    Тестовый клиент отключает close_old_connections, поэтому стоимость
+    открытия соединения (и выигрыш от DB_CONNECTION_MODE) видна только здесь.
+    """
+    request_started.send(sender=None)
+    try:
+        with connections["default"].cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        request_finished.send(sender=None)
+
+
+SCENARIOS = {
+    "list": scenario_list,
+    "public": scenario_public,
+    "create": scenario_create,
+    "update": scenario_update,
+    "delete": scenario_delete,
+    "token": scenario_token,
+    "refresh": scenario_refresh,
+    "profile": scenario_profile,
+    "db_roundtrip": scenario_db_roundtrip,
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+def summarize(latencies, errors, elapsed, connections_opened=None):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "connections_opened": connections_opened,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": _ms(statistics.fmean(latencies) if latencies else None),
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p95_ms": _ms(percentile(latencies, 0.95)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+    }
+
+
+def run_scenario(scenario, data, requests, workers):
+    """Выполняет ``requests`` запросов сценария в ``workers`` потоках.
+
+    У каждого потока свой тестовый клиент и своё соединение с БД; запросы
+    проходят через полный стек middleware и ROOT_URLCONF. Исключение в
+    представлении или сценарии считается ошибкой, а не останавливает поток.
+    """
+    remaining = iter(range(requests))
+    latencies = []
+    errors = 0
+    opened = 0
+    lock = threading.Lock()
+
+    def count_connection(**kwargs):
+        nonlocal opened
+        with lock:
+            opened += 1
+
+    def worker():
+        nonlocal errors
+        client = Client(raise_request_exception=False)
+        try:
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                started = time.perf_counter()
+                try:
+                    response = scenario(client, data)
+                except Exception as e:
+                    logger.warning("Scenario %s failed: %s", scenario.__name__, e)
+                    with lock:
+                        errors += 1
+                    continue
+                duration = time.perf_counter() - started
+                with lock:
+                    latencies.append(duration)
+                    if response is not None and response.status_code >= 400:
+                        errors += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    connection_created.connect(count_connection)
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        connection_created.disconnect(count_connection)
+    return summarize(latencies, errors, time.perf_counter() - started, opened)
+
+
+def run(scenarios, users, habits_per_user, public_ratio, requests, workers):
+    """Готовит данные, прогоняет сценарии и возвращает отчёт."""
+    disposable = requests if "delete" in scenarios else 0
+    data = seed(users, habits_per_user, public_ratio, disposable)
+    try:
+        results = {
+            name: run_scenario(SCENARIOS[name], data, requests, workers)
+            for name in scenarios
+        }
+    finally:
+        cleanup()
+    return {
+        "config": {
+            "users": users,
+            "habits_per_user": habits_per_user,
+            "public_ratio": public_ratio,
+            "requests": requests,
+            "workers": workers,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "scenarios": results,
+    }
+
+
+def empty_scenarios(report):
+    """Сценарии отчёта, не завершившие ни одного запроса."""
+    return [
+        name for name, result in report["scenarios"].items() if not result["requests"]
+    ]
+
+
+def compare(baseline, candidate, threshold):
+    """Сравнивает два отчёта; регрессия — рост p95 или падение RPS больше порога.
+
+    Возвращает:
+        list: Строки сравнения по сценариям, общим для обоих отчётов.
+    """
+    rows = []
+    for name, base in baseline["scenarios"].items():
+        new = candidate["scenarios"].get(name)
+        if new is None:
+            continue
+        p95_change = _change(base["p95_ms"], new["p95_ms"])
+        rps_change = _change(base["throughput_rps"], new["throughput_rps"])
+        slower = p95_change is not None and p95_change > threshold
+        fewer = rps_change is not None and rps_change < -threshold
+        # Сценарий, который ничего не измерил, не может считаться успешным.
+        regression = new["p95_ms"] is None or slower or fewer
+        rows.append(
+            {
+                "scenario": name,
+                "p95_ms": (base["p95_ms"], new["p95_ms"]),
+                "p95_change": p95_change,
+                "throughput_rps": (base["throughput_rps"], new["throughput_rps"]),
+                "throughput_change": rps_change,
+                "regression": regression,
+            }
+        )
+    return rows
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
@@ -0,0 +1,78 @@
+import base64
+
+from django.utils import timezone
+
+from .models import HabitCalendar
+
+YEAR_BYTES = 46  # 366 дней, округлённые вверх до байта
+
+
+def day_index(day):
+    """Номер дня в году, начиная с нуля."""
+    return day.timetuple().tm_yday - 1
+
+
+def set_day(days, day):
+    """Возвращает битовую карту с отмеченным днём."""
+    bits = bytearray(days or b"").ljust(YEAR_BYTES, b"\0")
+    index = day_index(day)
+    bits[index // 8] |= 1 << (index % 8)
+    return bytes(bits)
+
+
+def count_days(days, start=None, end=None):
+    """Считает отмеченные дни в диапазоне [start, end] битовыми операциями."""
+    value = int.from_bytes(bytes(days or b""), "little")
+    if start is not None:
+        value >>= day_index(start)
+        value <<= day_index(start)
+    if end is not None:
+        value &= (1 << (day_index(end) + 1)) - 1
+    return value.bit_count()
+
+
+def encode_days(days):
+    """Кодирует битовую карту года в base64 фиксированной длины."""
+    return base64.b64encode(bytes(days or b"").ljust(YEAR_BYTES, b"\0")).decode()
+
+
+def mark_completed(days):
+    """Отмечает дни в календарях привычек (вызывать внутри транзакции).
+
+    Аргументы:
+        days (list): Пары (habit_id, date).
+    """
+    keys = {(habit_id, day.year) for habit_id, day in days}
+    HabitCalendar.objects.bulk_create(
+        [HabitCalendar(habit_id=habit_id, year=year) for habit_id, year in keys],
+        ignore_conflicts=True,
+    )
+    calendars = {
+        (calendar.habit_id, calendar.year): calendar
+        for calendar in HabitCalendar.objects.select_for_update()
+        .filter(
+            habit_id__in={habit_id for habit_id, _ in keys},
+            year__in={year for _, year in keys},
+        )
+        .order_by("pk")
+    }
+    for habit_id, day in days:
+        calendar = calendars[(habit_id, day.year)]
+        calendar.days = set_day(calendar.days, day)
+    HabitCalendar.objects.bulk_update([calendars[key] for key in keys], ["days"])
+
+
+def rebuild_calendar(habit):
+    """Пересобирает календари привычки по истории выполнений."""
+    years = {}
+    completions = habit.completions.values_list("completed_at", flat=True)
+    for completed_at in completions.iterator():
+        day = timezone.localdate(completed_at)
+        years[day.year] = set_day(years.get(day.year), day)
+
+    HabitCalendar.objects.filter(habit=habit).exclude(year__in=years).delete()
+    for year, days in years.items():
+        HabitCalendar.objects.update_or_create(
+            habit=habit, year=year, defaults={"days": days}
+        )
+    return years
@@ -0,0 +1,121 @@
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+
+from .models import Habit, HabitStats
+from .schedule import occurrence_counts
+from .stats import current_streak, recent_completions
+
+DIGEST_DAYS = 7
+DIGEST_SUBJECT = "Ваши привычки за неделю"
+
+
+class DigestConnectionError(Exception):
+    """SMTP-соединение не открылось: ни одно письмо пачки не отправлено."""
+
+
+def digest_user_chunks(chunk_size):
+    """ID активных пользователей с привычками пачками по возрастанию ID.
+
+    Пачки выбираются по ключу (pk > последнего), без OFFSET.
+    """
+    User = get_user_model()
+    users = (
+        User.objects.filter(is_active=True)
+        .exclude(email="")
+        .filter(Exists(Habit.objects.filter(user=OuterRef("pk"))))
+        .order_by("pk")
+    )
+    last_id = 0
+    while True:
+        chunk = list(
+            users.filter(pk__gt=last_id).values_list("pk", flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def habit_summary(habit, stats, due, today):
+    return {
+        "action": habit.action,
+        "place": habit.place,
+        "time": habit.time,
+        "done": recent_completions(stats, today, DIGEST_DAYS) if stats else 0,
+        "due": due,
+        "streak": current_streak(stats, habit.frequency, today) if stats else 0,
+    }
+
+
+def build_messages(user_ids, today):
+    """Письма-сводки для пачки пользователей по готовой статистике HabitStats."""
+    User = get_user_model()
+    users = User.objects.filter(pk__in=user_ids).order_by("pk")
+    stats = {
+        row.habit_id: row
+        for row in HabitStats.objects.filter(habit__user_id__in=user_ids)
+    }
+    habits = list(Habit.objects.filter(user_id__in=user_ids).order_by("time", "pk"))
+    due = occurrence_counts(
+        [habit.frequency for habit in habits],
+        today - timedelta(days=DIGEST_DAYS - 1),
+        today,
+    )
+    habits_by_user = {}
+    for habit, habit_due in zip(habits, due.tolist()):
+        habits_by_user.setdefault(habit.user_id, []).append(
+            habit_summary(habit, stats.get(habit.pk), habit_due, today)
+        )
+
+    messages = []
+    for user in users:
+        habits = habits_by_user.get(user.pk)
+        if not habits:
+            continue
+        body = render_to_string(
+            "emails/weekly_digest.txt",
+            {
+                "user": user,
+                "habits": habits,
+                "start": today - timedelta(days=DIGEST_DAYS - 1),
+                "end": today,
+                "done": sum(habit["done"] for habit in habits),
+                "due": sum(habit["due"] for habit in habits),
+            },
+        )
+        messages.append(
+            EmailMessage(
+                DIGEST_SUBJECT, body, settings.DEFAULT_FROM_EMAIL, [user.email]
+            )
+        )
+    return messages
+
+
+def send_digests(user_ids, today):
+    """Отправляет сводки пачки через одно SMTP-соединение.
+
+    Ошибка при открытии соединения поднимается как DigestConnectionError;
+    ошибки во время отправки — как есть, потому что часть писем могла уже
+    уйти.
+
+    Возвращает:
+        int: Число отправленных писем.
+    """
+    messages = build_messages(user_ids, today)
+    if not messages:
+        return 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except (smtplib.SMTPException, OSError) as e:
+        raise DigestConnectionError(e) from e
+    try:
+        return connection.send_messages(messages)
+    finally:
+        connection.close()
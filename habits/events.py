@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+import redis
+from django.conf import settings
+
+from .utils import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+HABIT_CREATED = "habit.created"
+HABIT_UPDATED = "habit.updated"
+HABIT_DELETED = "habit.deleted"
+
+# Сколько событий ждёт медленного клиента, прежде чем новые отбрасываются.
+STREAM_QUEUE_SIZE = 100
+RESUBSCRIBE_DELAY = 1
+
+
+def channel(user_id):
+    return f"habits:events:{user_id}"
+
+
+def publish(user_id, event, data):
+    """Публикует событие в канал пользователя в Redis pub/sub.
+
+    Событие не доставляется, если Redis недоступен: клиенты перечитывают
+    список привычек при переподключении.
+    """
+    message = json.dumps({"event": event, "data": data})
+    try:
+        return get_redis().publish(channel(user_id), message)
+    except redis.RedisError as e:
+        logger.warning("Could not publish %s for user %s: %s", event, user_id, e)
+        return None
+
+
+def format_event(message):
+    """Преобразует сообщение из Redis в кадр text/event-stream."""
+    payload = json.loads(message)
+    return f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n"
+
+
+class Subscriber:
+    """Одна подписка на каналы всех пользователей на процесс (event loop).
+
+    Сообщения раздаются по очередям открытых потоков SSE, поэтому число
+    соединений с Redis не растёт с числом клиентов. Подписка держится,
+    пока открыт хотя бы один поток, и восстанавливается после ошибок Redis.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.listener = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.queues.setdefault(str(user_id), set()).add(queue)
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.queues.get(str(user_id), set())
+        queues.discard(queue)
+        if not queues:
+            self.queues.pop(str(user_id), None)
+        if not self.queues and self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+
+    async def listen(self):
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.psubscribe(channel("*"))
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+            except redis.RedisError as e:
+                logger.warning("Event subscription failed, resubscribing: %s", e)
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+    def dispatch(self, channel_name, data):
+        user_id = channel_name.rpartition(":")[2]
+        for queue in self.queues.get(user_id, ()):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                logger.warning("Dropped event for a slow stream of user %s", user_id)
+
+
+_subscribers = weakref.WeakKeyDictionary()
+
+
+def get_subscriber():
+    """Подписчик текущего event loop."""
+    loop = asyncio.get_running_loop()
+    subscriber = _subscribers.get(loop)
+    if subscriber is None:
+        subscriber = _subscribers[loop] = Subscriber()
+    return subscriber
+
+
+async def event_stream(user_id, expires_at):
+    """Поток SSE для пользователя до истечения его токена.
+
+    Пока событий нет, раз в SSE_KEEPALIVE секунд отправляется комментарий,
+    чтобы прокси не закрывали соединение. Когда токен истекает, поток
+    завершается, и клиент переподключается со свежим токеном.
+    """
+    subscriber = get_subscriber()
+    queue = subscriber.subscribe(user_id)
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        while (remaining := expires_at - time.time()) > 0:
+            try:
+                data = await asyncio.wait_for(
+                    queue.get(), timeout=min(settings.SSE_KEEPALIVE, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(data)
+    finally:
+        subscriber.unsubscribe(user_id, queue)
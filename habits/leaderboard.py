@@ -0,0 +1,165 @@
+import logging
+from collections import Counter
+
+import redis
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Habit, HabitCompletion
+from .utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_KEY = "habits:leaderboard:public"
+# Пока идёт reconcile(), изменения рейтинга дублируются сюда и после
+# сборки накладываются на пересчитанный набор.
+REBUILD_KEY = f"{LEADERBOARD_KEY}:rebuilding"
+STAGING_KEY = f"{LEADERBOARD_KEY}:rebuild"
+DELTA_KEY = f"{LEADERBOARD_KEY}:delta"
+DISCARDED_KEY = f"{LEADERBOARD_KEY}:discarded"
+REBUILD_TTL = 3600
+KEYS = [LEADERBOARD_KEY, REBUILD_KEY, DELTA_KEY, DISCARDED_KEY]
+
+INCREMENT_SCRIPT = """
+local score = redis.call('ZINCRBY', KEYS[1], ARGV[2], ARGV[1])
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('ZINCRBY', KEYS[3], ARGV[2], ARGV[1])
+    redis.call('SREM', KEYS[4], ARGV[1])
+end
+return score
+"""
+DISCARD_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], ARGV[1])
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('ZREM', KEYS[3], ARGV[1])
+    redis.call('SADD', KEYS[4], ARGV[1])
+end
+return removed
+"""
+# KEYS: рейтинг, пересчёт, дельта, удалённые, метка пересчёта.
+SWAP_SCRIPT = """
+redis.call('ZUNIONSTORE', KEYS[1], 2, KEYS[2], KEYS[3])
+for _, member in ipairs(redis.call('SMEMBERS', KEYS[4])) do
+    redis.call('ZREM', KEYS[1], member)
+end
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4], KEYS[5])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+def _safely(operation):
+    """Выполняет операцию с Redis, не ломая запись в базу при его недоступности.
+
+    Расхождения исправляет ночная сверка reconcile().
+    """
+    try:
+        return operation(get_redis())
+    except redis.RedisError as e:
+        logger.warning("Leaderboard update failed: %s", e)
+        return None
+
+
+def track(habit_id):
+    """Добавляет публичную привычку в рейтинг с нулевым счётом."""
+    return bump(habit_id, 0)
+
+
+def bump(habit_id, amount=1):
+    """Увеличивает счёт привычки (копирование или выполнение)."""
+    return _safely(
+        lambda r: r.register_script(INCREMENT_SCRIPT)(
+            keys=KEYS, args=[habit_id, amount]
+        )
+    )
+
+
+def bump_many(habit_ids):
+    """Увеличивает счёт нескольких привычек одним обращением к Redis."""
+
+    def increment(r):
+        script = r.register_script(INCREMENT_SCRIPT)
+        pipe = r.pipeline(transaction=False)
+        for habit_id, amount in Counter(habit_ids).items():
+            script(keys=KEYS, args=[habit_id, amount], client=pipe)
+        return pipe.execute()
+
+    return _safely(increment)
+
+
+def discard(habit_id):
+    """Убирает привычку из рейтинга (удалена или больше не публичная)."""
+    return _safely(
+        lambda r: r.register_script(DISCARD_SCRIPT)(keys=KEYS, args=[habit_id])
+    )
+
+
+def top(limit=10):
+    """Возвращает первые ``limit`` пар (habit_id, score) по убыванию счёта."""
+    entries = get_redis().zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+    return [(int(habit_id), int(score)) for habit_id, score in entries]
+
+
+def rank(habit_id):
+    """Возвращает (место с единицы, счёт) или None, если привычки нет в рейтинге."""
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrevrank(LEADERBOARD_KEY, habit_id)
+    pipe.zscore(LEADERBOARD_KEY, habit_id)
+    position, score = pipe.execute()
+    if position is None:
+        return None
+    return position + 1, int(score)
+
+
+def public_scores():
+    """Считает счёт публичных привычек по базе: копии плюс выполнения."""
+    copies = (
+        Habit.objects.filter(copied_from=OuterRef("pk"))
+        .order_by()
+        .values("copied_from")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    completions = (
+        HabitCompletion.objects.filter(habit=OuterRef("pk"))
+        .order_by()
+        .values("habit")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    habits = Habit.objects.filter(is_public=True).annotate(
+        copies_count=Coalesce(Subquery(copies, output_field=IntegerField()), 0),
+        completions_count=Coalesce(
+            Subquery(completions, output_field=IntegerField()), 0
+        ),
+    )
+    for habit_id, copies_count, completions_count in habits.values_list(
+        "pk", "copies_count", "completions_count"
+    ).iterator():
+        yield habit_id, copies_count + completions_count
+
+
+def reconcile(batch_size=5000):
+    """Пересобирает рейтинг из базы и атомарно подменяет им текущий ключ.
+
+    На время пересчёта bump(), track() и discard() дублируют изменения
+    в дельту, и она накладывается на пересчитанный набор вместе с заменой,
+    так что изменения, сделанные во время сверки, не теряются. Изменение,
+    зафиксированное в базе между установкой метки и началом чтения, может
+    учесться дважды — это расхождение на единицы, а не потеря.
+    """
+    connection = get_redis()
+    connection.delete(STAGING_KEY, DELTA_KEY, DISCARDED_KEY)
+    connection.set(REBUILD_KEY, 1, ex=REBUILD_TTL)
+
+    batch = {}
+    for habit_id, score in public_scores():
+        batch[habit_id] = score
+        if len(batch) >= batch_size:
+            connection.zadd(STAGING_KEY, batch)
+            batch = {}
+    if batch:
+        connection.zadd(STAGING_KEY, batch)
+
+    return connection.register_script(SWAP_SCRIPT)(
+        keys=[LEADERBOARD_KEY, STAGING_KEY, DELTA_KEY, DISCARDED_KEY, REBUILD_KEY]
+    )
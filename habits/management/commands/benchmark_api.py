@@ -0,0 +1,96 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from habits import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон API: заполняет базу тестовыми данными (bench-*), "
+        "выполняет сценарии в нескольких потоках и выводит p50/p95/p99 и RPS "
+        "в JSON. С --compare сравнивает два сохранённых отчёта."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--habits-per-user", type=int, default=50)
+        parser.add_argument("--public-ratio", type=float, default=0.2)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Запросов на сценарий."
+        )
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(benchmarks.SCENARIOS),
+            help="Сценарии через запятую: " + ", ".join(benchmarks.SCENARIOS),
+        )
+        parser.add_argument("--output", help="Файл для JSON-отчёта.")
+        parser.add_argument(
+            "--compare",
+            nargs=2,
+            metavar=("BASELINE", "CANDIDATE"),
+            help="Сравнить два отчёта вместо прогона.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.10,
+            help="Допустимое ухудшение p95/RPS при сравнении (доля).",
+        )
+
+    def handle(self, *args, **options):
+        if options["compare"]:
+            return self.compare(*options["compare"], options["threshold"])
+
+        scenarios = [name for name in options["scenarios"].split(",") if name]
+        unknown = set(scenarios) - set(benchmarks.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        report = benchmarks.run(
+            scenarios,
+            users=options["users"],
+            habits_per_user=options["habits_per_user"],
+            public_ratio=options["public_ratio"],
+            requests=options["requests"],
+            workers=options["workers"],
+        )
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+        empty = benchmarks.empty_scenarios(report)
+        if empty:
+            raise CommandError(f"No completed requests in: {', '.join(empty)}")
+
+    def compare(self, baseline_path, candidate_path, threshold):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        with open(candidate_path) as f:
+            candidate = json.load(f)
+
+        rows = benchmarks.compare(baseline, candidate, threshold)
+        for row in rows:
+            line = (
+                f"{row['scenario']:<10} "
+                f"p95 {row['p95_ms'][0]} -> {row['p95_ms'][1]} ms "
+                f"({_percent(row['p95_change'])}), "
+                f"rps {row['throughput_rps'][0]} -> {row['throughput_rps'][1]} "
+                f"({_percent(row['throughput_change'])})"
+            )
+            if row["regression"]:
+                self.stdout.write(self.style.ERROR(f"{line}  REGRESSION"))
+            else:
+                self.stdout.write(line)
+
+        regressions = [row["scenario"] for row in rows if row["regression"]]
+        if regressions:
+            raise CommandError(f"Regressions in: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+
+def _percent(change):
+    return "n/a" if change is None else f"{change:+.1%}"
@@ -0,0 +1,154 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from habits.models import Habit
+from habits.sync import changes_since, encode_token
+
+
+def plan_relations(plan):
+    """Таблицы и секции, которые читает план EXPLAIN (FORMAT JSON)."""
+    relations = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return relations
+
+
+def user_queries(user_id):
+    """Запросы, которые views.py выполняет для одного пользователя."""
+    return {
+        "list": Habit.objects.filter(user_id=user_id).order_by("id"),
+        "calendar": Habit.objects.filter(user_id=user_id).values_list("id", flat=True),
+        "sync": changes_since(
+            user_id, encode_token(timezone.now() - timedelta(hours=1))
+        )["changed"],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет секционирование habits_habit в PostgreSQL: сколько секций "
+        "читают запросы одного пользователя (EXPLAIN ANALYZE), размер и число "
+        "мёртвых строк по секциям, а с --vacuum — время VACUUM. Запустите до и "
+        "после миграции 0006 и сравните JSON-отчёты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=20, help="Пользователей в выборке."
+        )
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="Замерить VACUUM (ANALYZE) всей таблицы и крупнейшей секции.",
+        )
+        parser.add_argument("--output", help="Файл для JSON-отчёта.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning benchmark requires PostgreSQL.")
+
+        table = Habit._meta.db_table
+        report = {
+            "partitioned": self.is_partitioned(table),
+            "queries": self.explain_queries(options["users"]),
+            "relations": self.relation_stats(table),
+        }
+        if options["vacuum"]:
+            report["vacuum"] = self.time_vacuum(table, report["relations"])
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def is_partitioned(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+        return bool(row) and row[0] == "p"
+
+    def sample_users(self, count):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT DISTINCT user_id FROM {Habit._meta.db_table} "
+                "TABLESAMPLE SYSTEM (1) LIMIT %s",
+                [count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def explain_queries(self, users):
+        samples = {}
+        for user_id in self.sample_users(users):
+            for name, queryset in user_queries(user_id).items():
+                plan = json.loads(
+                    queryset.explain(format="json", analyze=True, buffers=True)
+                )[0]
+                stats = samples.setdefault(
+                    name, {"relations": [], "ms": [], "buffers": []}
+                )
+                root = plan["Plan"]
+                stats["relations"].append(len(plan_relations(root)))
+                stats["ms"].append(plan["Execution Time"])
+                stats["buffers"].append(
+                    root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0)
+                )
+        return {
+            name: {
+                "samples": len(stats["ms"]),
+                "relations_scanned": max(stats["relations"]),
+                "median_ms": round(statistics.median(stats["ms"]), 3),
+                "median_buffers": statistics.median(stats["buffers"]),
+            }
+            for name, stats in samples.items()
+        }
+
+    def relation_stats(self, table):
+        """Размер с индексами и мёртвые строки таблицы или каждой её секции."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname,
+                       pg_total_relation_size(c.oid),
+                       COALESCE(s.n_live_tup, 0),
+                       COALESCE(s.n_dead_tup, 0)
+                FROM pg_class c
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                WHERE c.oid IN (
+                    SELECT relid FROM pg_partition_tree(%s::regclass) WHERE isleaf
+                )
+                ORDER BY pg_total_relation_size(c.oid) DESC
+                """,
+                [table],
+            )
+            return [
+                {"name": name, "bytes": size, "live_rows": live, "dead_rows": dead}
+                for name, size, live, dead in cursor.fetchall()
+            ]
+
+    def time_vacuum(self, table, relations):
+        timings = {}
+        targets = {"table": table}
+        if len(relations) > 1:
+            targets["largest_partition"] = relations[0]["name"]
+        with connection.cursor() as cursor:
+            for label, relation in targets.items():
+                started = time.perf_counter()
+                cursor.execute(
+                    f"VACUUM (ANALYZE) {connection.ops.quote_name(relation)}"
+                )
+                timings[label] = {
+                    "relation": relation,
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+        return timings
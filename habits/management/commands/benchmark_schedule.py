@@ -0,0 +1,60 @@
+import json
+import random
+import time
+from datetime import time as dt_time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from habits import schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает развёртку расписаний через NumPy (habits.schedule.expand) "
+        "с поэлементным циклом на синтетических привычках; база не нужна."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=100_000)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--skip-naive",
+            action="store_true",
+            help="Не запускать медленный поэлементный вариант.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        habits = [
+            (rng.randint(1, 7), dt_time(rng.randrange(24), rng.randrange(0, 60, 5)))
+            for _ in range(options["habits"])
+        ]
+        start = timezone.localdate()
+        end = start + timedelta(days=options["days"] - 1)
+
+        started = time.perf_counter()
+        indices, moments = schedule.expand(
+            [frequency for frequency, _ in habits],
+            schedule.minutes_of_day([at for _, at in habits]),
+            start,
+            end,
+        )
+        vectorized = time.perf_counter() - started
+        report = {
+            "habits": len(habits),
+            "days": options["days"],
+            "occurrences": len(moments),
+            "vectorized_s": round(vectorized, 4),
+        }
+
+        if not options["skip_naive"]:
+            started = time.perf_counter()
+            naive = schedule.naive_expand(habits, start, end)
+            report["naive_s"] = round(time.perf_counter() - started, 4)
+            report["speedup"] = round(report["naive_s"] / max(vectorized, 1e-9), 1)
+            report["matches"] = naive == list(zip(moments.tolist(), indices.tolist()))
+
+        self.stdout.write(json.dumps(report, indent=2))
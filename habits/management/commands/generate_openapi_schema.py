@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from habit_tracker.openapi import generate_schema
+
+
+class Command(BaseCommand):
+    help = "Генерирует OpenAPI-схему в файл, который затем отдаётся без drf_yasg."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.OPENAPI_SCHEMA_PATH,
+            help="Путь к файлу схемы (по умолчанию OPENAPI_SCHEMA_PATH).",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["output"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(generate_schema())
+        self.stdout.write(self.style.SUCCESS(f"OpenAPI schema written to {path}."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from habits.bitmaps import rebuild_calendar
+from habits.models import Habit
+from habits.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает статистику и календари привычек по истории выполнений."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "habit_ids",
+            nargs="*",
+            type=int,
+            help="ID привычек (по умолчанию — все привычки).",
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.order_by("pk")
+        if options["habit_ids"]:
+            habits = habits.filter(pk__in=options["habit_ids"])
+
+        rebuilt = 0
+        for habit in habits.iterator(chunk_size=2000):
+            rebuild_stats(habit)
+            rebuild_calendar(habit)
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt stats and calendars for {rebuilt} habits.")
+        )
@@ -0,0 +1,260 @@
+import csv
+import io
+import random
+import secrets
+import time
+from datetime import time as dt_time
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from habits.models import Habit, Profile
+
+FREQUENCY_WEIGHTS = {1: 55, 2: 10, 3: 10, 4: 3, 5: 4, 6: 3, 7: 15}
+FREQUENCIES = list(FREQUENCY_WEIGHTS)
+FREQUENCY_CUM_WEIGHTS = list(accumulate(FREQUENCY_WEIGHTS.values()))
+DURATIONS = [2, 5, 10, 15, 20, 30, 45, 60, 90, 120]
+PLACES = ["Дом", "Парк", "Спортзал", "Офис", "Кухня", "Балкон", "Бассейн"]
+ACTIONS = [
+    "Пробежка",
+    "Зарядка",
+    "Чтение",
+    "Медитация",
+    "Стакан воды",
+    "Прогулка",
+    "Дневник",
+    "Растяжка",
+]
+PLEASANT_ACTIONS = ["Кофе", "Сериал", "Ванна", "Музыка", "Десерт"]
+REWARDS = ["Кофе", "Шоколадка", "Серия сериала", "10 минут соцсетей"]
+NULL = r"\N"
+HABIT_COLUMNS = (
+    "user_id",
+    "place",
+    "time",
+    "action",
+    "is_pleasant",
+    "frequency",
+    "duration",
+    "is_public",
+    "linked_habit_id",
+    "reward",
+)
+
+
+def random_time(rng):
+    """Время привычки: пики утром и вечером, округление до 5 минут."""
+    roll = rng.random()
+    if roll < 0.45:
+        minutes = rng.gauss(7.5 * 60, 45)
+    elif roll < 0.80:
+        minutes = rng.gauss(20 * 60, 60)
+    else:
+        minutes = rng.uniform(0, 24 * 60)
+    minutes = int(minutes) // 5 * 5 % (24 * 60)
+    return dt_time(minutes // 60, minutes % 60)
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует большой набор пользователей, профилей и привычек. "
+        "В PostgreSQL данные грузятся через COPY с заранее выделенными ID, "
+        "в остальных СУБД — через bulk_create. Пароль хешируется один раз."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--habits", type=int, default=1_000_000)
+        parser.add_argument("--public-ratio", type=float, default=0.1)
+        parser.add_argument("--pleasant-ratio", type=float, default=0.2)
+        parser.add_argument(
+            "--linked-ratio",
+            type=float,
+            default=0.3,
+            help="Доля полезных привычек, связанных с приятной привычкой.",
+        )
+        parser.add_argument("--telegram-ratio", type=float, default=0.6)
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+        parser.add_argument("--password", default="password123")
+        parser.add_argument("--seed", type=int, help="Seed генератора случайных чисел.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.use_copy = connection.vendor == "postgresql"
+        self.password = make_password(options["password"])
+        self.run_id = secrets.token_hex(4)
+
+        users_total = options["users"]
+        chunk_size = options["chunk_size"]
+        habits_per_user = options["habits"] / max(users_total, 1)
+
+        started = time.perf_counter()
+        created_users = created_habits = 0
+        for offset in range(0, users_total, chunk_size):
+            chunk_users = min(chunk_size, users_total - offset)
+            chunk_habits = (
+                options["habits"] - created_habits
+                if offset + chunk_users >= users_total
+                else round(chunk_users * habits_per_user)
+            )
+            with transaction.atomic():
+                user_ids = self.create_users(offset, chunk_users)
+                created_habits += self.create_habits(user_ids, chunk_habits)
+            created_users += chunk_users
+            self.stdout.write(
+                f"{created_users} users, {created_habits} habits "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {created_users} users and {created_habits} habits in "
+                f"{elapsed:.1f}s ({created_habits / max(elapsed, 1e-9):.0f} habits/s)."
+            )
+        )
+
+    def create_users(self, offset, count):
+        User = get_user_model()
+        user_ids = self.insert(
+            User,
+            ("email", "password"),
+            [
+                (f"seed-{self.run_id}-{offset + index}@example.com", self.password)
+                for index in range(count)
+            ],
+        )
+        telegram_ratio = self.options["telegram_ratio"]
+        self.insert(
+            Profile,
+            ("user_id", "telegram_id"),
+            [
+                (
+                    user_id,
+                    (
+                        str(10**9 + user_id)
+                        if self.rng.random() < telegram_ratio
+                        else None
+                    ),
+                )
+                for user_id in user_ids
+            ],
+        )
+        return user_ids
+
+    def create_habits(self, user_ids, count):
+        """Создаёт привычки с перекосом: у части пользователей их намного больше."""
+        rng = self.rng
+        owners = sorted(
+            user_ids[int(len(user_ids) * rng.random() ** 2)] for _ in range(count)
+        )
+        pleasant, useful = [], []
+        for user_id in owners:
+            if rng.random() < self.options["pleasant_ratio"]:
+                pleasant.append(self.habit(user_id, pleasant=True))
+            else:
+                useful.append(self.habit(user_id, pleasant=False))
+
+        pleasant_by_user = {}
+        for habit_id, habit in zip(
+            self.insert(Habit, HABIT_COLUMNS, pleasant), pleasant
+        ):
+            pleasant_by_user.setdefault(habit[0], []).append(habit_id)
+
+        linked_ratio = self.options["linked_ratio"]
+        for index, habit in enumerate(useful):
+            candidates = pleasant_by_user.get(habit[0])
+            if candidates and rng.random() < linked_ratio:
+                useful[index] = (*habit[:-2], rng.choice(candidates), None)
+            elif rng.random() < 0.5:
+                useful[index] = (*habit[:-1], rng.choice(REWARDS))
+        self.insert(Habit, HABIT_COLUMNS, useful)
+        return len(pleasant) + len(useful)
+
+    def habit(self, user_id, pleasant):
+        """Строка привычки в порядке HABIT_COLUMNS (без связи и награды)."""
+        rng = self.rng
+        return (
+            user_id,
+            rng.choice(PLACES),
+            random_time(rng),
+            rng.choice(PLEASANT_ACTIONS if pleasant else ACTIONS),
+            pleasant,
+            rng.choices(FREQUENCIES, cum_weights=FREQUENCY_CUM_WEIGHTS)[0],
+            rng.choice(DURATIONS),
+            rng.random() < self.options["public_ratio"],
+            None,
+            None,
+        )
+
+    def insert(self, model, columns, rows):
+        """Вставляет строки без сигналов и save(); возвращает их ID.
+
+        Аргументы:
+            columns: Имена атрибутов (attname), которые различаются по строкам.
+            rows: Кортежи значений в порядке columns.
+
+        В PostgreSQL строки сразу пишутся в CSV для COPY: остальные поля
+        одинаковы для всех строк и подготавливаются один раз.
+        """
+        if not rows:
+            return []
+        if not self.use_copy:
+            objects = model.objects.bulk_create(
+                [model(**dict(zip(columns, row))) for row in rows], batch_size=5000
+            )
+            return [obj.pk for obj in objects]
+
+        ids = self.reserve_ids(model, len(rows))
+        constants = self.constant_columns(model, columns)
+        names = [
+            model._meta.pk.column,
+            *(model._meta.get_field(name).column for name in columns),
+            *constants,
+        ]
+        tail = list(constants.values())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            [pk, *[NULL if value is None else value for value in row], *tail]
+            for pk, row in zip(ids, rows)
+        )
+
+        sql = (
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+            f"({', '.join(map(connection.ops.quote_name, names))}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+        )
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, "copy_expert"):  # psycopg2
+                buffer.seek(0)
+                cursor.cursor.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with cursor.cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+        return ids
+
+    def constant_columns(self, model, columns):
+        """Значения по умолчанию для остальных полей, готовые для CSV."""
+        template = model()
+        constants = {}
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.attname in columns:
+                continue
+            value = field.get_db_prep_save(field.pre_save(template, True), connection)
+            constants[field.column] = NULL if value is None else value
+        return constants
+
+    def reserve_ids(self, model, count):
+        """Выделяет ID из последовательности таблицы одним запросом."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                "FROM generate_series(1, %s)",
+                [model._meta.db_table, model._meta.pk.column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
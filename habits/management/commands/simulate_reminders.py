@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_time
+
+from habits import simulation
+
+
+def parse_moment(value):
+    """Момент из ISO-даты со временем или из ЧЧ:ММ (сегодня)."""
+    moment = parse_datetime(value)
+    if moment is None:
+        at = parse_time(value)
+        if at is None:
+            raise CommandError(f"Invalid --at value: {value}")
+        moment = datetime.combine(timezone.localdate(), at)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет напоминания на заданную минуту через настоящий код "
+        "habits.tasks.send_habit_reminder, но против локальной заглушки "
+        "Telegram с задержками, 429 и ошибками. Выводит пропускную "
+        "способность, распределение лага, пропуски и дубли в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--at", default="08:00", help="Минута рассылки: ЧЧ:ММ или ISO 8601."
+        )
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--limit", type=int, help="Не больше N напоминаний.")
+        parser.add_argument(
+            "--latency-ms", type=float, default=50, help="Средняя задержка ответа."
+        )
+        parser.add_argument("--jitter-ms", type=float, default=20)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=30,
+            help="Сообщений в секунду до ответа 429 (0 — без ограничения).",
+        )
+        parser.add_argument("--error-ratio", type=float, default=0.01)
+        parser.add_argument(
+            "--reset-ratio",
+            type=float,
+            default=0.0,
+            help="Доля доставленных сообщений, ответ на которые теряется.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Файл для JSON-отчёта.")
+
+    def handle(self, *args, **options):
+        moment = parse_moment(options["at"])
+        report = simulation.simulate(
+            moment,
+            workers=options["workers"],
+            limit=options["limit"],
+            latency=options["latency_ms"] / 1000,
+            jitter=options["jitter_ms"] / 1000,
+            rate=options["rate"],
+            error_ratio=options["error_ratio"],
+            reset_ratio=options["reset_ratio"],
+            seed=options["seed"],
+        )
+        report = {"at": moment.isoformat(), **report}
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        self.stdout.write(output)
@@ -0,0 +1,48 @@
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+
+class ReminderMetrics:
+    """Метрики отправки напоминаний.
+
+    Живые метрики — REMINDER_METRICS в общем реестре. Симулятор рассылки
+    создаёт свой экземпляр с отдельным реестром и префиксом: в многопроцессном
+    режиме значения пишутся в файлы процесса независимо от реестра, и только
+    другое имя не даёт им смешаться с живыми.
+    """
+
+    def __init__(self, registry=REGISTRY, namespace=""):
+        self.lag = Histogram(
+            "habit_reminder_lag_seconds",
+            "Задержка между запланированным и фактическим временем доставки напоминания.",
+            buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800),
+            namespace=namespace,
+            registry=registry,
+        )
+        self.telegram_latency = Histogram(
+            "telegram_api_latency_seconds",
+            "Время ответа Telegram Bot API.",
+            ["method"],
+            namespace=namespace,
+            registry=registry,
+        )
+        self.reminders = Counter(
+            "habit_reminders",
+            "Напоминания по результату: sent, failed, retried.",
+            ["result"],
+            namespace=namespace,
+            registry=registry,
+        )
+
+
+REMINDER_METRICS = ReminderMetrics()
+REMINDER_BATCH_SIZE = Histogram(
+    "habit_reminder_batch_size",
+    "Размер пачек напоминаний, отправляемых диспетчером в очередь.",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000),
+)
+QUEUE_DEPTH = Gauge(
+    "celery_queue_depth",
+    "Число задач, ожидающих в очереди брокера.",
+    ["queue"],
+    multiprocess_mode="livemax",
+)
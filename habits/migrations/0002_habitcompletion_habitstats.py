@@ -0,0 +1,73 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitStats",
+            fields=[
+                (
+                    "habit",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="habits.habit",
+                    ),
+                ),
+                ("current_streak", models.PositiveIntegerField(default=0)),
+                ("longest_streak", models.PositiveIntegerField(default=0)),
+                ("last_completed_slot", models.IntegerField(blank=True, null=True)),
+                ("last_completed_on", models.DateField(blank=True, null=True)),
+                ("total_completions", models.PositiveIntegerField(default=0)),
+                ("recent_days", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HabitCompletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Время выполнения",
+                    ),
+                ),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="completions",
+                        to="habits.habit",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["habit", "completed_at"],
+                        name="habits_habi_habit_i_99b107_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0002_habitcompletion_habitstats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitCalendar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="Год")),
+                ("days", models.BinaryField(default=bytes, verbose_name="Дни")),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="calendars",
+                        to="habits.habit",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("habit", "year"), name="unique_habit_calendar_year"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0003_habitcalendar"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="habit",
+            name="copied_from",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="copies",
+                to="habits.habit",
+                verbose_name="Скопирована из",
+            ),
+        ),
+    ]
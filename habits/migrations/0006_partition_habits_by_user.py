@@ -0,0 +1,157 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+PARTITIONS = 32
+
+
+def rebuild_habit_table(apps, schema_editor, partitions):
+    """Пересоздаёт habits_habit с данными: секционированной по хешу user_id
+    (partitions секций) или обычной (partitions=None).
+
+    Таблица блокируется на время копирования, поэтому на больших объёмах
+    миграцию нужно запускать в окно обслуживания.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    Habit = apps.get_model("habits", "Habit")
+    table = Habit._meta.db_table
+    old = f"{table}_old"
+    sequence = f"{table}_id_seq"
+    qn = schema_editor.quote_name
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        (old_sequence,) = cursor.fetchone()
+        cursor.execute(f"SELECT last_value FROM {old_sequence}")
+        (last_value,) = cursor.fetchone()
+        cursor.execute(f"SELECT MAX(id) FROM {qn(table)}")
+        (max_id,) = cursor.fetchone()
+    last_id = max(last_value, max_id or 0)
+
+    partition_by = " PARTITION BY HASH (user_id)" if partitions else ""
+    schema_editor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+    schema_editor.execute(
+        f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING CONSTRAINTS)"
+        f"{partition_by}"
+    )
+    for remainder in range(partitions or 0):
+        schema_editor.execute(
+            f"CREATE TABLE {qn(f'{table}_p{remainder}')} PARTITION OF {qn(table)} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+    schema_editor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+    # Вместе со старой таблицей удаляются её индексы, ограничения и
+    # последовательность; ссылок на неё нет (db_constraint=False).
+    schema_editor.execute(f"DROP TABLE {qn(old)}")
+
+    if partitions:
+        # Секционированная таблица не может иметь столбец IDENTITY
+        # (PostgreSQL < 17), поэтому id берётся из обычной последовательности.
+        schema_editor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+        schema_editor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id "
+            f"SET DEFAULT nextval({schema_editor.quote_value(sequence)})"
+        )
+    else:
+        # Обычной таблице возвращается IDENTITY, как её создаёт Django.
+        schema_editor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id "
+            "ADD GENERATED BY DEFAULT AS IDENTITY"
+        )
+    schema_editor.execute(
+        "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, last_id]
+    )
+    primary_key = "id, user_id" if partitions else "id"
+    schema_editor.execute(
+        f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_pkey')} "
+        f"PRIMARY KEY ({primary_key})"
+    )
+    user_field = Habit._meta.get_field("user")
+    schema_editor.execute(
+        schema_editor._create_fk_sql(
+            Habit, user_field, "_fk_%(to_table)s_%(to_column)s"
+        )
+    )
+    for statement in schema_editor._model_indexes_sql(Habit):
+        schema_editor.execute(statement)
+
+
+def partition_habits(apps, schema_editor):
+    rebuild_habit_table(apps, schema_editor, PARTITIONS)
+
+
+def unpartition_habits(apps, schema_editor):
+    rebuild_habit_table(apps, schema_editor, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("habits", "0005_habit_updated_at_habittombstone"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="habit",
+            name="copied_from",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="copies",
+                to="habits.habit",
+                verbose_name="Скопирована из",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="linked_habit",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="linked_to",
+                to="habits.habit",
+                verbose_name="Связанная привычка",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habitcalendar",
+            name="habit",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="calendars",
+                to="habits.habit",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habitcompletion",
+            name="habit",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="completions",
+                to="habits.habit",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="habitstats",
+            name="habit",
+            field=models.OneToOneField(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                primary_key=True,
+                related_name="stats",
+                serialize=False,
+                to="habits.habit",
+            ),
+        ),
+        migrations.RunPython(partition_habits, unpartition_habits),
+    ]
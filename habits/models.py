@@ -2,12 +2,19 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 
 class Habit(models.Model):
-    """Модель для привычек."""
+    """Модель для привычек.
+
+    В PostgreSQL таблица секционирована по хешу user_id (миграция 0006),
+    её первичный ключ — (id, user_id). Поэтому ссылки на привычку объявлены
+    с db_constraint=False: каскадное удаление и SET_NULL выполняет Django.
+    """
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="habits"
@@ -21,6 +28,7 @@ class Habit(models.Model):
         null=True,
         blank=True,
         on_delete=models.SET_NULL,
+        db_constraint=False,
         related_name="linked_to",
         verbose_name="Связанная привычка",
     )
@@ -44,6 +52,25 @@ class Habit(models.Model):
         verbose_name="Длительность",
     )
     is_public = models.BooleanField(default=False, verbose_name="Публичная привычка")
+    copied_from = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        related_name="copies",
+        verbose_name="Скопирована из",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменена")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at"]),
+            # Публичная лента и фильтр в админке.
+            models.Index(
+                fields=["id"], condition=Q(is_public=True), name="habit_public_idx"
+            ),
+        ]
 
     def clean(self):
         """Выполняет валидацию данных перед сохранением."""
@@ -89,3 +116,93 @@ def manage_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
     else:
         instance.profile.save()
+
+
+class HabitCompletion(models.Model):
+    """Отметка о выполнении привычки."""
+
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, db_constraint=False, related_name="completions"
+    )
+    completed_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Время выполнения"
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["habit", "completed_at"])]
+
+    def __str__(self):
+        return f"{self.habit_id} at {self.completed_at}"
+
+
+class HabitStats(models.Model):
+    """Инкрементально поддерживаемая статистика привычки.
+
+    Поля:
+        - current_streak: Текущая серия выполненных периодов подряд.
+        - longest_streak: Самая длинная серия.
+        - last_completed_slot: Номер последнего выполненного периода
+          (дни с начала эры, делённые на частоту).
+        - last_completed_on: Дата последнего выполнения.
+        - total_completions: Общее число отметок.
+        - recent_days: Битовая маска последних дней (бит 0 — last_completed_on).
+    """
+
+    habit = models.OneToOneField(
+        Habit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name="stats",
+    )
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_completed_slot = models.IntegerField(null=True, blank=True)
+    last_completed_on = models.DateField(null=True, blank=True)
+    total_completions = models.PositiveIntegerField(default=0)
+    recent_days = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for {self.habit_id}"
+
+
+class HabitCalendar(models.Model):
+    """Календарь выполнений привычки за год в виде битовой карты.
+
+    Бит i (младший бит первого байта — 1 января) отмечает выполнение
+    в i-й день года.
+    """
+
+    habit = models.ForeignKey(
+        Habit, on_delete=models.CASCADE, db_constraint=False, related_name="calendars"
+    )
+    year = models.PositiveSmallIntegerField(verbose_name="Год")
+    days = models.BinaryField(default=bytes, verbose_name="Дни")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["habit", "year"], name="unique_habit_calendar_year"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id} in {self.year}"
+
+
+class HabitTombstone(models.Model):
+    """След удалённой привычки для дельта-синхронизации клиентов."""
+
+    habit_id = models.BigIntegerField(verbose_name="ID привычки")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="habit_tombstones",
+    )
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="Удалена")
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "deleted_at"])]
+
+    def __str__(self):
+        return f"{self.habit_id} deleted at {self.deleted_at}"
@@ -1,10 +1,13 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
-from .models import Habit
+from habit_tracker.timing import TimedSerializerMixin
 
+from .models import Habit, HabitStats
+from .stats import completion_rate, current_streak, recent_completions
 
-class HabitSerializer(serializers.ModelSerializer):
+
+class HabitSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для работы с моделью Habit.
 
     Поля:
@@ -12,6 +15,8 @@ class HabitSerializer(serializers.ModelSerializer):
         - user: Владелец привычки (только для чтения).
         - place, time, action: Информация о привычке.
         - is_pleasant, frequency, reward, duration, is_public: Детали привычки.
+        - copied_from: Публичная привычка, из которой сделана копия.
+        - updated_at: Время последнего изменения (только для чтения).
     """
 
     class Meta:
@@ -27,8 +32,10 @@ class HabitSerializer(serializers.ModelSerializer):
             "reward",
             "duration",
             "is_public",
+            "copied_from",
+            "updated_at",
         ]
-        read_only_fields = ["user"]
+        read_only_fields = ["user", "copied_from", "updated_at"]
 
     def validate(self, data):
         """Проверка данных для привычки:
@@ -53,6 +60,44 @@ class HabitSerializer(serializers.ModelSerializer):
         return data
 
 
+class HabitStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Сериализатор статистики привычки.
+
+    Поля:
+        - current_streak: Текущая серия (0, если период пропущен).
+        - longest_streak: Самая длинная серия.
+        - last_completed_slot, last_completed_on: Последнее выполнение.
+        - total_completions: Общее число выполнений.
+        - recent_completions, completion_rate: Показатели за последние 30 дней.
+    """
+
+    current_streak = serializers.SerializerMethodField()
+    recent_completions = serializers.SerializerMethodField()
+    completion_rate = serializers.SerializerMethodField()
+
+    class Meta:
+        model = HabitStats
+        fields = [
+            "habit",
+            "current_streak",
+            "longest_streak",
+            "last_completed_slot",
+            "last_completed_on",
+            "total_completions",
+            "recent_completions",
+            "completion_rate",
+        ]
+
+    def get_current_streak(self, obj):
+        return current_streak(obj, obj.habit.frequency)
+
+    def get_recent_completions(self, obj):
+        return recent_completions(obj)
+
+    def get_completion_rate(self, obj):
+        return round(completion_rate(obj, obj.habit.frequency), 4)
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """Сериализатор для регистрации пользователей.
 
@@ -1,11 +1,84 @@
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import Profile
+from habit_tracker import response_cache
+
+from . import events, leaderboard
+from .models import Habit, HabitTombstone, Profile
+from .serializers import HabitSerializer
 
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created and not Profile.objects.filter(user=instance).exists():
         Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Habit)
+def sync_public_leaderboard(sender, instance, created, **kwargs):
+    """Добавляет публичные привычки в рейтинг и убирает ставшие приватными."""
+    habit_id = instance.pk
+    if instance.is_public:
+        transaction.on_commit(lambda: leaderboard.track(habit_id))
+    elif not created:
+        transaction.on_commit(lambda: leaderboard.discard(habit_id))
+
+
+@receiver(post_delete, sender=Habit)
+def drop_from_leaderboard(sender, instance, **kwargs):
+    habit_id = instance.pk
+    transaction.on_commit(lambda: leaderboard.discard(habit_id))
+
+
+@receiver(post_save, sender=Habit)
+def expire_public_responses(sender, instance, created, **kwargs):
+    """Сбрасывает закэшированную публичную ленту, если изменение в ней видно."""
+    if instance.is_public or not created:
+        transaction.on_commit(lambda: response_cache.bump("habits"))
+
+
+@receiver(post_delete, sender=Habit)
+def expire_public_responses_on_delete(sender, instance, **kwargs):
+    # Удаление обнуляет linked_habit у зависимых привычек, в том числе публичных.
+    transaction.on_commit(lambda: response_cache.bump("habits"))
+
+
+@receiver(post_save, sender=Habit)
+def publish_habit_saved(sender, instance, created, **kwargs):
+    """Сообщает клиентам владельца о создании или изменении привычки."""
+    user_id = instance.user_id
+    event = events.HABIT_CREATED if created else events.HABIT_UPDATED
+    data = HabitSerializer(instance).data
+    transaction.on_commit(lambda: events.publish(user_id, event, data))
+
+
+@receiver(post_delete, sender=Habit)
+def publish_habit_deleted(sender, instance, **kwargs):
+    user_id, data = instance.user_id, {"id": instance.pk}
+    transaction.on_commit(lambda: events.publish(user_id, events.HABIT_DELETED, data))
+
+
+@receiver(pre_delete, sender=Habit)
+def touch_dependent_habits(sender, instance, **kwargs):
+    """Обновляет updated_at привычек, ссылки которых обнулит удаление.
+
+    SET_NULL выполняется через queryset.update() без auto_now, и без этого
+    клиенты не узнали бы об изменении при дельта-синхронизации.
+    """
+    Habit.objects.filter(Q(linked_habit=instance) | Q(copied_from=instance)).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_delete, sender=Habit)
+def leave_tombstone(sender, instance, origin=None, **kwargs):
+    """Оставляет след удаления, если удаляется сама привычка, а не её владелец."""
+    User = get_user_model()
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return
+    HabitTombstone.objects.create(habit_id=instance.pk, user_id=instance.user_id)
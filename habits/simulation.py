@@ -0,0 +1,309 @@
+import heapq
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from celery.exceptions import Retry
+from django.db import connections
+from django.utils import timezone
+from prometheus_client import CollectorRegistry
+
+from .metrics import ReminderMetrics
+from .tasks import deliver_reminder, due_reminder_habits, send_habit_reminder
+from .webhook import DONE_CALLBACK_PREFIX
+
+logger = logging.getLogger(__name__)
+
+METRICS_NAMESPACE = "simulation"
+
+
+class FakeTelegram(ThreadingHTTPServer):
+    """Локальная заглушка Bot API для sendMessage.
+
+    Аргументы:
+        latency, jitter: Среднее и разброс задержки ответа (секунды).
+        rate: Сколько сообщений в секунду принимается (0 — без ограничения);
+            сверх этого отвечает 429 с retry_after, как Telegram.
+        error_ratio: Доля ответов 500.
+        reset_ratio: Доля сообщений, которые доставлены, но соединение
+            обрывается без ответа — клиент повторит их и получит дубль.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, latency=0.05, jitter=0.02, rate=30, error_ratio=0, reset_ratio=0, seed=0
+    ):
+        super().__init__(("127.0.0.1", 0), FakeTelegramHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.error_ratio = error_ratio
+        self.reset_ratio = reset_ratio
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.deliveries = []
+        self.responses = {"ok": 0, "rate_limited": 0, "error": 0, "reset": 0}
+        self.tokens = rate
+        self.refilled = time.monotonic()
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def take_token(self):
+        """Токен-бакет на rate сообщений в секунду; None — можно отправлять."""
+        if not self.rate:
+            return None
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return max(1, round((1 - self.tokens) / self.rate))
+
+    def outcome(self):
+        """Решает, что ответить: ok, rate_limited, error или reset."""
+        with self.lock:
+            retry_after = self.take_token()
+            roll = self.rng.random()
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter))
+        if retry_after:
+            return "rate_limited", retry_after, delay
+        if roll < self.error_ratio:
+            return "error", None, delay
+        if roll < self.error_ratio + self.reset_ratio:
+            return "reset", None, delay
+        return "ok", None, delay
+
+    def deliver(self, outcome, fields):
+        with self.lock:
+            self.responses[outcome] += 1
+            if outcome in ("ok", "reset"):
+                self.deliveries.append(
+                    (time.monotonic(), habit_from_markup(fields.get("reply_markup")))
+                )
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        fields = {
+            key: values[0]
+            for key, values in parse_qs(self.rfile.read(length).decode()).items()
+        }
+        outcome, retry_after, delay = self.server.outcome()
+        time.sleep(delay)
+        self.server.deliver(outcome, fields)
+
+        if outcome == "reset":
+            self.close_connection = True
+            return
+        if outcome == "rate_limited":
+            status, body = 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after %d" % retry_after,
+                "parameters": {"retry_after": retry_after},
+            }
+        elif outcome == "error":
+            status, body = 500, {
+                "ok": False,
+                "error_code": 500,
+                "description": "Internal Server Error",
+            }
+        else:
+            status, body = 200, {"ok": True, "result": {"message_id": 1}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def habit_from_markup(markup):
+    """ID привычки из callback_data кнопки «Выполнено»."""
+    try:
+        button = json.loads(markup)["inline_keyboard"][0][0]
+        return int(button["callback_data"].removeprefix(DONE_CALLBACK_PREFIX))
+    except (TypeError, ValueError, KeyError, IndexError):
+        return None
+
+
+class ReminderRunner:
+    """Выполняет send_habit_reminder в нескольких потоках, как воркеры Celery.
+
+    Задача запускается в eager-режиме, но повтор не выполняется сразу, как в
+    Task.apply(): он откладывается на countdown из Retry, пока поток берёт
+    следующие задачи. Сообщения уходят на api_url, метрики пишутся в metrics.
+    """
+
+    def __init__(self, workers, scheduled_at, api_url, metrics):
+        self.workers = workers
+        self.scheduled_at = scheduled_at
+        self.api_url = api_url
+        self.metrics = metrics
+        self.heap = []
+        self.pending = 0
+        self.attempts = 0
+        self.condition = threading.Condition()
+
+    def submit(self, habit_id, retries=0, delay=0):
+        with self.condition:
+            heapq.heappush(
+                self.heap,
+                (time.monotonic() + delay, uuid.uuid4().hex, habit_id, retries),
+            )
+            if not retries:
+                self.pending += 1
+            self.condition.notify()
+
+    def next_job(self):
+        with self.condition:
+            while self.pending:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                wait = self.heap[0][0] - time.monotonic()
+                if wait <= 0:
+                    return heapq.heappop(self.heap)
+                self.condition.wait(wait)
+            return None
+
+    def execute(self, task_id, habit_id, retries):
+        send_habit_reminder.push_request(
+            id=task_id, retries=retries, is_eager=True, called_directly=False
+        )
+        try:
+            deliver_reminder(
+                send_habit_reminder,
+                habit_id,
+                self.scheduled_at,
+                api_url=self.api_url,
+                metrics=self.metrics,
+            )
+        except Retry as retry:
+            self.submit(habit_id, retries + 1, retry.when or 0)
+            return
+        except Exception:
+            logger.exception("Simulated reminder for habit %s failed", habit_id)
+        finally:
+            send_habit_reminder.pop_request()
+            with self.condition:
+                self.attempts += 1
+        with self.condition:
+            self.pending -= 1
+            self.condition.notify_all()
+
+    def work(self):
+        try:
+            while job := self.next_job():
+                _, task_id, habit_id, retries = job
+                self.execute(task_id, habit_id, retries)
+        finally:
+            connections.close_all()
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.work, daemon=True) for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    if len(values) == 1:
+        value = round(values[0], 3)
+        return {"p50": value, "p95": value, "p99": value, "max": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49], 3),
+        "p95": round(cuts[94], 3),
+        "p99": round(cuts[98], 3),
+        "max": round(max(values), 3),
+    }
+
+
+def summarize(habit_ids, deliveries, started, finished):
+    """Отчёт по доставкам: пропуски, дубли, лаг первой доставки и пропускная способность.
+
+    Аргументы:
+        habit_ids: ID привычек, которым положено напоминание.
+        deliveries: Пары (момент time.monotonic(), ID привычки), принятые сервером.
+        started, finished: Начало и конец прогона (time.monotonic()).
+    """
+    expected = set(habit_ids)
+    first = {}
+    for moment, habit_id in sorted(deliveries, key=lambda row: row[0]):
+        if habit_id in expected:
+            first.setdefault(habit_id, moment)
+    lags = [moment - started for moment in first.values()]
+    elapsed = finished - started
+    return {
+        "due": len(expected),
+        "delivered": len(first),
+        "dropped": len(expected - set(first)),
+        "duplicates": sum(1 for _, h in deliveries if h in expected) - len(first),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(first) / elapsed, 1) if elapsed > 0 else None,
+        "lag_s": percentiles(lags),
+    }
+
+
+def simulate(moment, workers=16, limit=None, **server_options):
+    """Прогоняет напоминания на момент moment через заглушку Telegram.
+
+    Привычки выбираются тем же запросом, что и в dispatch_due_reminders;
+    отсчёт лага идёт от начала прогона — как если бы он стартовал ровно
+    в запланированную минуту. Метрики прогона пишутся в отдельный реестр
+    с префиксом METRICS_NAMESPACE, живые метрики напоминаний не меняются.
+    """
+    habit_ids = list(
+        due_reminder_habits(moment).order_by("pk").values_list("pk", flat=True)[:limit]
+    )
+    registry = CollectorRegistry()
+    metrics = ReminderMetrics(registry, namespace=METRICS_NAMESPACE)
+    server = FakeTelegram(**server_options).start()
+    runner = ReminderRunner(workers, timezone.now().isoformat(), server.url, metrics)
+    try:
+        started = time.monotonic()
+        for habit_id in habit_ids:
+            runner.submit(habit_id)
+        runner.run()
+        finished = time.monotonic()
+    finally:
+        server.stop()
+
+    report = summarize(habit_ids, server.deliveries, started, finished)
+    report["attempts"] = runner.attempts
+    report["responses"] = server.responses
+    sample = f"{METRICS_NAMESPACE}_habit_reminders_total"
+    report["reminders"] = {
+        result: int(registry.get_sample_value(sample, {"result": result}) or 0)
+        for result in ("sent", "retried", "failed")
+    }
+    return report
@@ -0,0 +1,150 @@
+import math
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import leaderboard
+from .bitmaps import mark_completed
+from .models import HabitCompletion, HabitStats
+
+ROLLING_WINDOW_DAYS = 30
+WINDOW_MASK = (1 << ROLLING_WINDOW_DAYS) - 1
+STATS_FIELDS = [
+    "current_streak",
+    "longest_streak",
+    "last_completed_slot",
+    "last_completed_on",
+    "total_completions",
+    "recent_days",
+]
+
+
+def habit_slot(frequency, day):
+    """Возвращает номер периода привычки для даты.
+
+    Период длится ``frequency`` дней и отсчитывается от начала эры, поэтому
+    номер соседнего периода всегда отличается ровно на единицу.
+    """
+    return day.toordinal() // frequency
+
+
+def apply_completion(stats, frequency, day):
+    """Учитывает одно выполнение привычки в строке статистики (без сохранения).
+
+    Выполнения в прошлом (раньше last_completed_on) попадают только в
+    счётчики и маску последних дней; серии пересчитывает rebuild_stats.
+    """
+    slot = habit_slot(frequency, day)
+    last_day = stats.last_completed_on
+
+    if last_day is None or day > last_day:
+        if last_day is None:
+            stats.recent_days = 1
+            stats.current_streak = 1
+        else:
+            shift = (day - last_day).days
+            stats.recent_days = ((stats.recent_days << shift) | 1) & WINDOW_MASK
+            last_slot = habit_slot(frequency, last_day)
+            if slot == last_slot + 1:
+                stats.current_streak += 1
+            elif slot > last_slot + 1:
+                stats.current_streak = 1
+        stats.last_completed_on = day
+        stats.last_completed_slot = slot
+    else:
+        offset = (last_day - day).days
+        if offset < ROLLING_WINDOW_DAYS:
+            stats.recent_days |= 1 << offset
+
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    stats.total_completions += 1
+    return stats
+
+
+def record_completion(habit, completed_at=None):
+    """Сохраняет выполнение привычки и атомарно обновляет её статистику."""
+    return record_completions([(habit, completed_at or timezone.now())])[0]
+
+
+def record_completions(entries):
+    """Сохраняет пачку выполнений одной транзакцией.
+
+    Аргументы:
+        entries (list): Пары (habit, completed_at).
+
+    Возвращает:
+        list: Созданные HabitCompletion.
+    """
+    entries = sorted(entries, key=lambda entry: entry[1])
+    habit_ids = sorted({habit.pk for habit, _ in entries})
+    with transaction.atomic():
+        completions = HabitCompletion.objects.bulk_create(
+            [
+                HabitCompletion(habit=habit, completed_at=completed_at)
+                for habit, completed_at in entries
+            ]
+        )
+        HabitStats.objects.bulk_create(
+            [HabitStats(habit_id=habit_id) for habit_id in habit_ids],
+            ignore_conflicts=True,
+        )
+        stats = {
+            row.pk: row
+            for row in HabitStats.objects.select_for_update()
+            .filter(pk__in=habit_ids)
+            .order_by("pk")
+        }
+
+        days = []
+        for habit, completed_at in entries:
+            day = timezone.localdate(completed_at)
+            apply_completion(stats[habit.pk], habit.frequency, day)
+            days.append((habit.pk, day))
+        HabitStats.objects.bulk_update(stats.values(), STATS_FIELDS)
+        mark_completed(days)
+
+        public_ids = [habit.pk for habit, _ in entries if habit.is_public]
+        if public_ids:
+            transaction.on_commit(lambda: leaderboard.bump_many(public_ids))
+    return completions
+
+
+def rebuild_stats(habit):
+    """Пересчитывает статистику привычки по всей истории выполнений."""
+    stats = HabitStats(habit=habit)
+    completions = habit.completions.order_by("completed_at").values_list(
+        "completed_at", flat=True
+    )
+    for completed_at in completions.iterator():
+        apply_completion(stats, habit.frequency, timezone.localdate(completed_at))
+    stats.save()
+    return stats
+
+
+def current_streak(stats, frequency, today=None):
+    """Текущая серия с учётом пропущенных периодов после последнего выполнения."""
+    if stats.last_completed_on is None:
+        return 0
+    today = today or timezone.localdate()
+    last_slot = habit_slot(frequency, stats.last_completed_on)
+    if habit_slot(frequency, today) - last_slot > 1:
+        return 0
+    return stats.current_streak
+
+
+def recent_completions(stats, today=None, days=ROLLING_WINDOW_DAYS):
+    """Число дней с выполнением за последние days дней (не больше окна)."""
+    if stats.last_completed_on is None:
+        return 0
+    today = today or timezone.localdate()
+    shift = (today - stats.last_completed_on).days
+    days = min(days, ROLLING_WINDOW_DAYS)
+    if shift >= days:
+        return 0
+    return ((stats.recent_days << max(shift, 0)) & ((1 << days) - 1)).bit_count()
+
+
+def completion_rate(stats, frequency, today=None):
+    """Доля выполненных периодов за последние ROLLING_WINDOW_DAYS дней."""
+    expected = math.ceil(ROLLING_WINDOW_DAYS / frequency)
+    return min(recent_completions(stats, today) / expected, 1.0)
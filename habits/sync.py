@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Habit, HabitTombstone
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def encode_token(moment):
+    """Токен синхронизации: момент в микросекундах от начала эпохи."""
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_token(token):
+    """Момент из токена; InvalidSyncToken — не число, вне диапазона дат
+    или в будущем."""
+    try:
+        microseconds = int(token)
+        moment = datetime.fromtimestamp(microseconds / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise InvalidSyncToken(token)
+    if microseconds < 0 or moment > timezone.now():
+        raise InvalidSyncToken(token)
+    return moment
+
+
+def changes_since(user, token=None):
+    """Изменения привычек пользователя после момента из токена.
+
+    Новый токен отстаёт от текущего времени на SYNC_TOKEN_LAG: транзакция,
+    начатая раньше, может зафиксироваться позже запроса, и её изменения
+    придут при следующей синхронизации. Повторно присланные привычки
+    клиент просто перезаписывает.
+
+    Если токен старше срока хранения следов удаления, возвращается полный
+    список с reset=True — клиент заменяет им локальные данные.
+
+    Возвращает:
+        dict: changed (queryset привычек), deleted (список ID), token, reset.
+    """
+    now = timezone.now()
+    since = decode_token(token) if token else None
+    reset = since is None or since < now - settings.SYNC_TOMBSTONE_TTL
+
+    habits = Habit.objects.filter(user=user).order_by("updated_at", "pk")
+    deleted = []
+    if not reset:
+        habits = habits.filter(updated_at__gt=since)
+        deleted = list(
+            HabitTombstone.objects.filter(user=user, deleted_at__gt=since)
+            .values_list("habit_id", flat=True)
+            .distinct()
+        )
+    return {
+        "changed": habits,
+        "deleted": deleted,
+        "token": encode_token(now - timedelta(seconds=settings.SYNC_TOKEN_LAG)),
+        "reset": reset,
+    }
+
+
+def purge_tombstones():
+    """Удаляет следы удаления старше SYNC_TOMBSTONE_TTL."""
+    cutoff = timezone.now() - settings.SYNC_TOMBSTONE_TTL
+    deleted, _ = HabitTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -1,22 +1,226 @@
-import os
+import logging
+import time
+from datetime import date
 
-import telegram
+import redis
+import requests
 from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from . import digest, leaderboard, sync, webhook
+from .metrics import QUEUE_DEPTH, REMINDER_BATCH_SIZE, REMINDER_METRICS
 from .models import Habit
+from .schedule import due_frequencies
+from .utils import send_telegram_message
 
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+logger = logging.getLogger(__name__)
+
+REMINDER_BATCH = 500
+REMINDER_MAX_RETRIES = 3
+
+
+def due_reminder_habits(moment):
+    """Привычки с Telegram ID, напоминание о которых приходится на минуту moment."""
+    moment = timezone.localtime(moment)
+    return Habit.objects.filter(
+        time__hour=moment.hour,
+        time__minute=moment.minute,
+        frequency__in=due_frequencies(moment.date()),
+        user__profile__telegram_id__isnull=False,
+    ).exclude(user__profile__telegram_id="")
+
+
+def queue_keys(queue):
+    """Ключи Redis очереди с учётом подочередей приоритетов."""
+    options = settings.CELERY_BROKER_TRANSPORT_OPTIONS
+    return [
+        f"{queue}{options['sep']}{step}" if step else queue
+        for step in options["priority_steps"]
+    ]
+
+
+def record_queue_depth(queue="reminders"):
+    """Обновляет метрику длины очереди брокера Redis."""
+    try:
+        pipeline = redis.Redis.from_url(settings.CELERY_BROKER_URL).pipeline()
+        for key in queue_keys(queue):
+            pipeline.llen(key)
+        depth = sum(pipeline.execute())
+    except redis.RedisError as e:
+        logger.warning("Could not read queue depth for %s: %s", queue, e)
+        return None
+    QUEUE_DEPTH.labels(queue).set(depth)
+    return depth
 
 
 @shared_task
-def send_habit_reminder(habit_id):
+def dispatch_due_reminders(moment=None):
+    """Ставит в очередь напоминания, запланированные на текущую минуту.
+
+    Подтверждается при получении, а не после выполнения: повторная доставка
+    поставила бы в очередь все напоминания минуты ещё раз.
+    """
+    moment = parse_datetime(moment) if moment else timezone.now()
+    scheduled_at = moment.replace(second=0, microsecond=0)
+
+    dispatched = 0
+    batch = []
+    habit_ids = due_reminder_habits(scheduled_at).values_list("pk", flat=True)
+    for habit_id in habit_ids.iterator(chunk_size=REMINDER_BATCH):
+        batch.append(habit_id)
+        if len(batch) == REMINDER_BATCH:
+            dispatched += enqueue_reminders(batch, scheduled_at)
+            batch = []
+    if batch:
+        dispatched += enqueue_reminders(batch, scheduled_at)
+
+    for queue in settings.CELERY_TASK_QUEUES:
+        record_queue_depth(queue.name)
+    return dispatched
+
+
+def enqueue_reminders(habit_ids, scheduled_at):
+    REMINDER_BATCH_SIZE.observe(len(habit_ids))
+    for habit_id in habit_ids:
+        send_habit_reminder.delay(habit_id, scheduled_at.isoformat())
+    return len(habit_ids)
+
+
+@shared_task(
+    bind=True,
+    max_retries=REMINDER_MAX_RETRIES,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def send_habit_reminder(self, habit_id, scheduled_at=None):
+    """Отправляет напоминание в Telegram.
+
+    Временные ошибки (сеть, 429, 5xx) повторяются с задержкой, которую
+    подсказывает Telegram; задержка доставки пишется в метрику лага.
+    """
+    return deliver_reminder(self, habit_id, scheduled_at)
+
+
+def deliver_reminder(
+    task, habit_id, scheduled_at=None, api_url=None, metrics=REMINDER_METRICS
+):
+    """Тело send_habit_reminder с явными адресом Bot API и метриками.
+
+    Аргументы:
+        task: Задача, через которую выполняются повторы (self.retry).
+        api_url (str): Адрес Bot API; по умолчанию settings.TELEGRAM_API_URL.
+        metrics (ReminderMetrics): Куда писать результаты и задержки.
+    """
+    habit = Habit.objects.select_related("user__profile").filter(pk=habit_id).first()
+    telegram_id = habit and habit.user.profile.telegram_id
+    if not telegram_id:
+        metrics.reminders.labels("failed").inc()
+        logger.warning("Reminder for habit %s skipped: no recipient", habit_id)
+        return False
+
+    message = f"Reminder: {habit.action} at {habit.time} in {habit.place}."
+    started = time.perf_counter()
     try:
-        habit = Habit.objects.get(id=habit_id)
-        user = habit.user
-        telegram_id = user.profile.telegram_id
-        bot = telegram.Bot(token=TELEGRAM_BOT_TOKEN)
-
-        message = f"Reminder: {habit.action} at {habit.time} in {habit.place}."
-        bot.send_message(chat_id=telegram_id, text=message)
-    except Exception as e:
-        print(f"Error sending reminder: {e}")
+        result = send_telegram_message(
+            telegram_id,
+            message,
+            reply_markup=webhook.done_keyboard(habit.pk),
+            api_url=api_url,
+        )
+    except (requests.RequestException, ValueError) as e:
+        result = {"ok": False, "description": str(e)}
+    finally:
+        metrics.telegram_latency.labels("sendMessage").observe(
+            time.perf_counter() - started
+        )
+
+    if result.get("ok"):
+        metrics.reminders.labels("sent").inc()
+        if scheduled_at:
+            lag = timezone.now() - parse_datetime(scheduled_at)
+            metrics.lag.observe(max(lag.total_seconds(), 0))
+        return True
+
+    error_code = result.get("error_code")
+    retryable = error_code is None or error_code == 429 or error_code >= 500
+    if retryable and task.request.retries < task.max_retries:
+        metrics.reminders.labels("retried").inc()
+        retry_after = (result.get("parameters") or {}).get("retry_after")
+        raise task.retry(countdown=retry_after or 2**task.request.retries)
+
+    metrics.reminders.labels("failed").inc()
+    logger.error(
+        "Error sending reminder for habit %s: %s", habit_id, result.get("description")
+    )
+    return False
+
+
+@shared_task
+def reconcile_leaderboard():
+    """Сверяет рейтинг публичных привычек в Redis с базой данных."""
+    return leaderboard.reconcile()
+
+
+@shared_task
+def purge_habit_tombstones():
+    """Удаляет устаревшие следы удалённых привычек."""
+    return sync.purge_tombstones()
+
+
+@shared_task(ignore_result=True)
+def flush_completion_buffer(batch_size=500, max_batches=20):
+    """Переносит отметки «Выполнено» из буфера Redis в базу пачками."""
+    saved = 0
+    for claim_key, raw_entries in webhook.reclaim_stale_batches():
+        # Повторно упавшая пачка не должна задерживать новые отметки.
+        try:
+            saved += apply_completion_batch(claim_key, raw_entries)
+        except Exception:
+            logger.exception("Failed to retry buffered completions %s", claim_key)
+    for _ in range(max_batches):
+        claim_key, raw_entries = webhook.drain_buffer(batch_size)
+        if not raw_entries:
+            break
+        saved += apply_completion_batch(claim_key, raw_entries)
+    return saved
+
+
+def apply_completion_batch(claim_key, raw_entries):
+    """Записывает пачку в базу и подтверждает её.
+
+    При ошибке пачка остаётся забранной: её повторит reclaim_stale_batches().
+    """
+    saved = webhook.apply_buffered_completions(raw_entries)
+    webhook.ack_batch(claim_key)
+    return saved
+
+
+@shared_task
+def send_weekly_digest(chunk_size=None):
+    """Ставит в очередь отправку недельных сводок пачками пользователей."""
+    today = timezone.localdate().isoformat()
+    chunks = 0
+    for user_ids in digest.digest_user_chunks(
+        chunk_size or settings.WEEKLY_DIGEST_CHUNK_SIZE
+    ):
+        send_digest_chunk.delay(user_ids, today)
+        chunks += 1
+    return chunks
+
+
+@shared_task(
+    rate_limit=settings.WEEKLY_DIGEST_RATE_LIMIT,
+    autoretry_for=(digest.DigestConnectionError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def send_digest_chunk(user_ids, today):
+    """Отправляет сводки пачке пользователей через одно SMTP-соединение.
+
+    Повтор выполняется только при ошибке открытия соединения. Обрыв во
+    время отправки не повторяется: часть пачки уже доставлена, и повтор
+    отправил бы этим пользователям сводку дважды.
+    """
+    return digest.send_digests(user_ids, date.fromisoformat(today))
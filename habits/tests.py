@@ -1,10 +1,62 @@
+import asyncio
+import gzip
+import json
+import os
+import smtplib
+import tempfile
+import time
+from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+import redis
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (AsyncClient, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY, generate_latest
+from prometheus_client.mmap_dict import MmapedDict, mmap_key
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import AccessToken
 
-from habits.models import Habit
+from habit_tracker import metrics, openapi, response_cache
+from habit_tracker.celery import app as celery_app
+from habit_tracker.db_routers import (PrimaryReplicaRouter,
+                                      ReplicaRoutingMiddleware, pin_key,
+                                      replica_reads)
+from habit_tracker.paginators import EstimatedCountPaginator
+from habits import benchmarks, digest, events, schedule, simulation
+from habits.bitmaps import count_days, set_day
+from habits.leaderboard import public_scores
+from habits.management.commands.benchmark_partitions import plan_relations
+from habits.models import Habit, HabitStats, HabitTombstone, Profile
+from habits.stats import (completion_rate, current_streak, rebuild_stats,
+                          record_completion)
+from habits.sync import encode_token
+from habits.tasks import (dispatch_due_reminders, due_reminder_habits,
+                          flush_completion_buffer, queue_keys,
+                          send_digest_chunk, send_habit_reminder)
+from habits.utils import send_telegram_message
+from habits.webhook import (DEAD_LETTER_KEY, apply_buffered_completions,
+                            done_keyboard, parse_done_callback,
+                            reclaim_stale_batches)
 
 
 class HabitAPITest(APITestCase):
@@ -80,6 +132,41 @@ class HabitAPITest(APITestCase):
         self.assertEqual(response.data[0]["action"], "Morning jog")
 
 
+class BenchmarkCompareTest(TestCase):
+    def test_compare_flags_regressions(self):
+        baseline = {"scenarios": {"list": {"p95_ms": 10.0, "throughput_rps": 100.0}}}
+        slower = {"scenarios": {"list": {"p95_ms": 12.0, "throughput_rps": 99.0}}}
+        same = {"scenarios": {"list": {"p95_ms": 10.5, "throughput_rps": 98.0}}}
+        self.assertTrue(benchmarks.compare(baseline, slower, 0.1)[0]["regression"])
+        self.assertFalse(benchmarks.compare(baseline, same, 0.1)[0]["regression"])
+        empty = {"scenarios": {"list": {"p95_ms": None, "throughput_rps": 0.0}}}
+        self.assertTrue(benchmarks.compare(baseline, empty, 0.1)[0]["regression"])
+
+
+class BenchmarkScenarioTest(TransactionTestCase):
+    def test_update_scenario_completes_requests(self):
+        data = benchmarks.seed(users=1, habits_per_user=2, public_ratio=0, disposable=0)
+        result = benchmarks.run_scenario(
+            benchmarks.scenario_update, data, requests=3, workers=1
+        )
+        self.assertEqual((result["requests"], result["errors"]), (3, 0))
+
+
+class PartitionPlanTest(TestCase):
+    def test_collects_scanned_partitions_from_plan(self):
+        plan = {
+            "Node Type": "Sort",
+            "Plans": [
+                {
+                    "Node Type": "Index Scan",
+                    "Relation Name": "habits_habit_p7",
+                    "Plans": [],
+                }
+            ],
+        }
+        self.assertEqual(plan_relations(plan), {"habits_habit_p7"})
+
+
 class UserRegistrationTest(APITestCase):
     def test_register_user_success(self):
         data = {
@@ -104,3 +191,933 @@ class UserRegistrationTest(APITestCase):
         response = self.client.post(reverse("user-register"), data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Username already exists", str(response.data))
+
+
+class CompletionTestCase(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="stats@example.com", password="testpassword"
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.habit = Habit.objects.create(
+            user=self.user, place="Home", time="08:00:00", action="Read", duration=20
+        )
+
+    def complete_on(self, day):
+        record_completion(
+            self.habit,
+            timezone.make_aware(datetime.combine(day, datetime.min.time())),
+        )
+
+
+class HabitStatsTest(CompletionTestCase):
+    def test_streak_grows_and_resets(self):
+        start = date(2026, 1, 1)
+        for offset in (0, 1, 2, 4):
+            self.complete_on(start + timedelta(days=offset))
+        stats = HabitStats.objects.get(habit=self.habit)
+        self.assertEqual(stats.current_streak, 1)
+        self.assertEqual(stats.longest_streak, 3)
+        self.assertEqual(stats.total_completions, 4)
+        self.assertEqual(current_streak(stats, 1, start + timedelta(days=5)), 1)
+        self.assertEqual(current_streak(stats, 1, start + timedelta(days=6)), 0)
+        self.assertEqual(completion_rate(stats, 1, start + timedelta(days=4)), 4 / 30)
+
+    def test_rebuild_matches_incremental(self):
+        start = date(2026, 1, 1)
+        for offset in (3, 0, 1, 2):
+            self.complete_on(start + timedelta(days=offset))
+        stats = rebuild_stats(self.habit)
+        self.assertEqual(stats.current_streak, 4)
+        self.assertEqual(stats.recent_days, 0b1111)
+
+    def test_complete_and_stats_endpoints(self):
+        response = self.client.post(reverse("habit-complete", args=[self.habit.pk]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse("habit-stats", args=[self.habit.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_streak"], 1)
+        self.assertEqual(response.data["total_completions"], 1)
+
+
+class HabitCalendarTest(CompletionTestCase):
+    def test_count_days_range(self):
+        days = b""
+        for day in (date(2026, 1, 1), date(2026, 1, 9), date(2026, 12, 31)):
+            days = set_day(days, day)
+        self.assertEqual(count_days(days), 3)
+        self.assertEqual(count_days(days, date(2026, 1, 2), date(2026, 12, 30)), 1)
+
+    def test_calendar_endpoint(self):
+        self.complete_on(date(2026, 3, 1))
+        self.complete_on(date(2026, 3, 2))
+        response = self.client.get(
+            reverse("habit-calendar"),
+            {"year": 2026, "start": "2026-03-02", "end": "2026-12-31"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["habit"], self.habit.pk)
+        self.assertEqual(response.data["results"][0]["count"], 1)
+
+    def test_calendar_rejects_invalid_date(self):
+        response = self.client.get(
+            reverse("habit-calendar"), {"year": 2026, "start": "2026-02-30"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitLeaderboardTest(CompletionTestCase):
+    def test_copy_public_habit(self):
+        self.habit.is_public = True
+        self.habit.save()
+        other = get_user_model().objects.create_user(
+            email="copier@example.com", password="testpassword"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(other)}")
+        response = self.client.post(reverse("habit-copy", args=[self.habit.pk]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        copy = Habit.objects.get(pk=response.data["id"])
+        self.assertEqual(copy.user, other)
+        self.assertEqual(copy.copied_from, self.habit)
+        self.assertFalse(copy.is_public)
+
+    def test_public_scores_count_copies_and_completions(self):
+        self.habit.is_public = True
+        self.habit.save()
+        self.complete_on(date(2026, 1, 1))
+        Habit.objects.create(
+            user=self.user,
+            place="Home",
+            time="08:00:00",
+            action="Read",
+            duration=20,
+            copied_from=self.habit,
+        )
+        self.assertEqual(dict(public_scores()), {self.habit.pk: 2})
+
+    def test_leaderboard_unavailable_without_redis(self):
+        self.client.credentials()
+        with patch("habits.views.leaderboard.get_redis") as get_redis:
+            get_redis.return_value.zrevrange.side_effect = redis.ConnectionError()
+            get_redis.return_value.pipeline.return_value.execute.side_effect = (
+                redis.ConnectionError()
+            )
+            for url in (
+                reverse("public-habits-leaderboard"),
+                reverse("habit-rank", args=[self.habit.pk]),
+            ):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+
+class TelegramWebhookTest(CompletionTestCase):
+    def buffered(self, telegram_id, habit_id, callback_id):
+        update = {
+            "callback_query": {
+                "id": callback_id,
+                "from": {"id": telegram_id},
+                "data": f"done:{habit_id}",
+            }
+        }
+        return json.dumps(parse_done_callback(update))
+
+    def test_buffered_completions_are_written_in_bulk(self):
+        self.user.profile.telegram_id = "42"
+        self.user.profile.save()
+        saved = apply_buffered_completions(
+            [
+                self.buffered(42, self.habit.pk, "a"),
+                self.buffered(42, self.habit.pk, "a"),
+                self.buffered(7, self.habit.pk, "b"),
+            ]
+        )
+        self.assertEqual(saved, 1)
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).total_completions, 1)
+
+    def test_malformed_buffered_completions_are_skipped(self):
+        self.user.profile.telegram_id = "42"
+        self.user.profile.save()
+        entry = json.loads(self.buffered(42, self.habit.pk, "a"))
+        malformed = [
+            "not json",
+            "[]",
+            json.dumps({**entry, "callback_query_id": "b", "habit_id": None}),
+            json.dumps({k: v for k, v in entry.items() if k != "habit_id"}),
+            json.dumps({**entry, "callback_query_id": "c", "telegram_id": 42}),
+            json.dumps({**entry, "callback_query_id": "d", "completed_at": "x"}),
+        ]
+        saved = apply_buffered_completions([*malformed, json.dumps(entry)])
+        self.assertEqual(saved, 1)
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).total_completions, 1)
+
+    @patch("habits.tasks.webhook")
+    def test_failed_batch_stays_claimed(self, webhook):
+        webhook.reclaim_stale_batches.return_value = []
+        webhook.drain_buffer.return_value = ("claim", ["{}"])
+        webhook.apply_buffered_completions.side_effect = RuntimeError("db down")
+        with self.assertRaises(RuntimeError):
+            flush_completion_buffer()
+        webhook.ack_batch.assert_not_called()
+
+    @patch("habits.tasks.webhook")
+    def test_failing_stale_batch_does_not_block_new_batches(self, webhook):
+        webhook.reclaim_stale_batches.return_value = [("stale", ["{}"])]
+        webhook.drain_buffer.side_effect = [("claim", ["{}"]), ("empty", [])]
+        webhook.apply_buffered_completions.side_effect = [RuntimeError("bad"), 1]
+        with self.assertLogs("habits.tasks", "ERROR"):
+            self.assertEqual(flush_completion_buffer(), 1)
+        webhook.ack_batch.assert_called_once_with("claim")
+
+    @patch("habits.webhook.get_redis")
+    def test_exhausted_batches_are_not_retried(self, get_redis):
+        client = get_redis.return_value
+        client.zrangebyscore.return_value = ["dead", "retry"]
+        client.register_script.return_value.side_effect = [3, ["{}"]]
+        with self.assertLogs("habits.webhook", "ERROR"):
+            batches = list(reclaim_stale_batches())
+        self.assertEqual(batches, [("retry", ["{}"])])
+        keys = client.register_script.return_value.call_args_list[0].kwargs["keys"]
+        self.assertEqual(keys[0], "dead")
+        self.assertIn(DEAD_LETTER_KEY, keys)
+
+    @override_settings(TELEGRAM_WEBHOOK_SECRET="secret")
+    def test_webhook_rejects_invalid_secret(self):
+        response = self.client.post(
+            reverse("telegram-webhook"),
+            {},
+            format="json",
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN="wrong",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingTest(CompletionTestCase):
+    def test_server_timing_header(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("list-habits"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        self.assertIn("total;dur=", timing)
+        self.assertRegex(timing, r'db;dur=[0-9.]+;desc="[1-9][0-9]* queries"')
+        self.assertIn("serializer;dur=", timing)
+
+    def test_header_is_hidden_from_regular_users(self):
+        with self.assertLogs("habit_tracker.timing", "INFO"):
+            response = self.client.get(reverse("list-habits"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Server-Timing", response)
+        self.client.credentials()
+        response = self.client.get(reverse("public-habits"))
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(DEBUG=True)
+    def test_header_is_sent_to_everyone_in_debug(self):
+        self.client.credentials()
+        response = self.client.get(reverse("public-habits"))
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("list-habits"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class ProfilingTest(CompletionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+
+    def test_staff_request_is_profiled(self):
+        self.user.is_staff = True
+        self.user.save()
+        with override_settings(PROFILE_DIR=self.profile_dir.name, PROFILE_MAX_FILES=1):
+            self.client.get(reverse("list-habits"), HTTP_X_PROFILE="1")
+            response = self.client.get(reverse("list-habits"), HTTP_X_PROFILE="1")
+        self.assertIn("X-Profile-Id", response)
+        self.assertEqual(
+            os.listdir(self.profile_dir.name), [response["X-Profile-Id"]]
+        )
+
+    def test_regular_user_is_not_profiled(self):
+        with override_settings(PROFILE_DIR=self.profile_dir.name):
+            response = self.client.get(reverse("list-habits"), HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(os.listdir(self.profile_dir.name), [])
+
+
+class ReminderMetricsTest(CompletionTestCase):
+    def test_due_reminder_habits(self):
+        self.user.profile.telegram_id = "42"
+        self.user.profile.save()
+        Habit.objects.create(
+            user=self.user,
+            place="Home",
+            time="08:00:00",
+            action="Stretch",
+            duration=5,
+            frequency=7,
+        )
+        # 2026-10-25 — день срабатывания привычек с частотой 7, 2026-10-19 — нет.
+        weekly_day = timezone.make_aware(datetime(2026, 10, 25, 8, 0, 30))
+        other_day = timezone.make_aware(datetime(2026, 10, 19, 8, 0, 30))
+        due = set(due_reminder_habits(weekly_day).values_list("action", flat=True))
+        self.assertEqual(due, {"Read", "Stretch"})
+        due = set(due_reminder_habits(other_day).values_list("action", flat=True))
+        self.assertEqual(due, {"Read"})
+        self.assertFalse(due_reminder_habits(other_day + timedelta(minutes=1)).exists())
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("list-habits"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"http_request_duration_seconds", response.content)
+        self.assertIn(b"habit_reminder_lag_seconds", response.content)
+
+    def test_metrics_are_collected_from_every_service_directory(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        key = mmap_key("jobs", "jobs_total", [], [], "Jobs.")
+        # Одинаковый PID в разных контейнерах не смешивает их файлы.
+        for service, value in (("web", 2), ("celery_bulk", 3)):
+            os.mkdir(os.path.join(root.name, service))
+            values = MmapedDict(os.path.join(root.name, service, "counter_1.db"))
+            values.write_value(key, value, 0)
+            values.close()
+        env = dict.fromkeys(
+            ("PROMETHEUS_MULTIPROC_DIR", "PROMETHEUS_METRICS_ROOT"), root.name
+        )
+        with patch.dict(os.environ, env):
+            output = generate_latest(metrics.get_registry())
+        self.assertIn(b"jobs_total 5.0", output)
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class OpenAPISchemaTest(APITestCase):
+    def test_schema_is_served_with_etag(self):
+        response = self.client.get(reverse("schema-json"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/habits/", json.loads(response.content)["paths"])
+        response = self.client.get(
+            reverse("schema-json"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_swagger_ui_points_to_schema(self):
+        response = self.client.get(reverse("schema-swagger-ui"))
+        self.assertContains(response, reverse("schema-json"))
+        self.assertContains(response, "/static/drf-yasg/swagger-ui-dist/")
+
+    def test_stale_prebuilt_schema_is_ignored_in_debug(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as f:
+            f.write(b"{}")
+            f.flush()
+            os.utime(f.name, (0, 0))
+            with override_settings(OPENAPI_SCHEMA_PATH=f.name, DEBUG=True):
+                self.assertIsNone(openapi.prebuilt_schema())
+            with override_settings(OPENAPI_SCHEMA_PATH=f.name, DEBUG=False):
+                self.assertEqual(openapi.prebuilt_schema(), b"{}")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReplicaRoutingTest(CompletionTestCase):
+    def route(self, method):
+        """Прогоняет запрос через middleware и возвращает БД для чтения."""
+        seen = []
+
+        def view(request):
+            seen.append(PrimaryReplicaRouter().db_for_read(Habit))
+            return HttpResponse(status=200)
+
+        request = getattr(RequestFactory(), method)(
+            reverse("list-habits"),
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+        )
+        ReplicaRoutingMiddleware(view)(request)
+        return seen[0]
+
+    def test_reads_use_primary_without_replica(self):
+        with replica_reads():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Habit), "default")
+
+    def test_user_is_pinned_to_primary_after_write(self):
+        with patch(
+            "habit_tracker.db_routers.replica_configured", return_value=True
+        ), patch("habit_tracker.db_routers.replica_available", return_value=True):
+            self.assertEqual(self.route("get"), "replica")
+            self.assertIsNone(cache.get(pin_key(self.user.pk)))
+            self.assertEqual(self.route("post"), "default")
+            self.assertEqual(cache.get(pin_key(self.user.pk)), 1)
+            self.assertEqual(self.route("get"), "default")
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with patch(
+            "habit_tracker.db_routers.replica_configured", return_value=True
+        ), patch("habit_tracker.db_routers.replica_available", return_value=False):
+            self.assertEqual(self.route("get"), "default")
+
+
+class CeleryRoutingTest(TestCase):
+    def route(self, task_name):
+        return celery_app.amqp.router.route({}, task_name)
+
+    def test_reminders_do_not_share_queue_with_bulk_tasks(self):
+        route = self.route("habits.tasks.send_habit_reminder")
+        self.assertEqual(route["queue"].name, "reminders")
+        self.assertEqual(route["priority"], 3)
+        self.assertEqual(self.route("habits.tasks.some_export")["queue"].name, "bulk")
+        self.assertEqual(
+            self.route("habits.tasks.reconcile_leaderboard")["queue"].name,
+            "maintenance",
+        )
+
+    def test_reminder_is_acknowledged_after_execution(self):
+        self.assertTrue(send_habit_reminder.acks_late)
+        self.assertTrue(send_habit_reminder.reject_on_worker_lost)
+        self.assertFalse(dispatch_due_reminders.acks_late)
+
+    def test_queue_depth_counts_priority_subqueues(self):
+        self.assertEqual(
+            queue_keys("reminders"),
+            ["reminders", "reminders:3", "reminders:6", "reminders:9"],
+        )
+
+
+class ReminderSaturationTest(TransactionTestCase):
+    """Напоминания не ждут за заданиями bulk, даже когда их очередь забита.
+
+    Воркеры запускаются в потоках по профилям из docker-compose (одна
+    очередь на воркер) поверх брокера в памяти.
+    """
+
+    BULK_JOBS = 20
+    BULK_SECONDS = 0.25
+    REMINDERS = 5
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="saturation@example.com", password="testpassword"
+        )
+        user.profile.telegram_id = "42"
+        user.profile.save()
+        self.habit = Habit.objects.create(
+            user=user, place="Home", time="08:00:00", action="Read", duration=20
+        )
+        self.app = Celery("saturation", set_as_current=False)
+        self.app.config_from_object("django.conf:settings", namespace="CELERY")
+        self.app.conf.update(
+            CELERY_BROKER_URL="memory://",
+            CELERY_BROKER_TRANSPORT_OPTIONS={"polling_interval": 0.01},
+        )
+
+        @self.app.task(name="habits.tests.bulk_export")
+        def bulk_export(seconds):
+            time.sleep(seconds)
+
+        self.addCleanup(celery_app.set_default)
+        self.addCleanup(celery_app.set_current)
+        self.delivered = []
+        patcher = patch("habits.tasks.send_telegram_message", side_effect=self.send)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, *args, **kwargs):
+        self.delivered.append(time.monotonic())
+        return {"ok": True}
+
+    def reminder_lags(self):
+        """Лаг от постановки напоминаний в очередь до отправки, в секундах."""
+        self.delivered.clear()
+        sent = time.monotonic()
+        for _ in range(self.REMINDERS):
+            self.app.send_task("habits.tasks.send_habit_reminder", args=[self.habit.pk])
+        deadline = sent + 10
+        while len(self.delivered) < self.REMINDERS and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.delivered), self.REMINDERS)
+        return [moment - sent for moment in self.delivered]
+
+    def test_reminder_latency_stays_flat_while_bulk_is_saturated(self):
+        with start_worker(
+            self.app, queues=["reminders"], perform_ping_check=False
+        ), start_worker(self.app, queues=["bulk"], perform_ping_check=False):
+            idle = max(self.reminder_lags())
+            for _ in range(self.BULK_JOBS):
+                self.app.send_task("habits.tests.bulk_export", args=[self.BULK_SECONDS])
+            saturated = max(self.reminder_lags())
+            with self.app.connection_for_write() as connection:
+                backlog = connection.default_channel.queue_purge("bulk")
+        self.assertGreater(backlog, 0)
+        self.assertLess(saturated, idle + self.BULK_SECONDS)
+
+
+class HabitEventsTest(CompletionTestCase):
+    def test_write_paths_publish_events_on_commit(self):
+        with patch("habits.events.publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    reverse("habit-update", args=[self.habit.pk]),
+                    {"duration": 30, "frequency": 1},
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse("habit-delete", args=[self.habit.pk]))
+        (user_id, event, data), _ = publish.call_args_list[0]
+        self.assertEqual((user_id, event), (self.user.pk, events.HABIT_UPDATED))
+        self.assertEqual(data["duration"], 30)
+        self.assertEqual(
+            publish.call_args_list[-1].args,
+            (self.user.pk, events.HABIT_DELETED, {"id": self.habit.pk}),
+        )
+
+    def test_stream_is_not_served_under_wsgi(self):
+        response = self.client.get(reverse("habit-events"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_stream_requires_authorization_header(self):
+        token = str(AccessToken.for_user(self.user))
+        client = AsyncClient()
+        response = await client.get(reverse("habit-events"), {"token": token})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await client.get(
+            reverse("habit-events"), headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+    def test_event_is_formatted_as_sse_frame(self):
+        message = json.dumps({"event": events.HABIT_DELETED, "data": {"id": 1}})
+        self.assertEqual(
+            events.format_event(message),
+            'event: habit.deleted\ndata: {"id": 1}\n\n',
+        )
+
+
+class FakePubSub:
+    def __init__(self):
+        self.patterns = []
+        self.messages = asyncio.Queue()
+
+    async def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self):
+        pass
+
+
+class EventSubscriberTest(TestCase):
+    async def test_streams_share_one_subscription(self):
+        pubsub = FakePubSub()
+        message = json.dumps({"event": events.HABIT_DELETED, "data": {"id": 1}})
+        with patch("habits.events.get_async_redis") as get_async_redis:
+            get_async_redis.return_value.pubsub.return_value = pubsub
+            streams = [
+                events.event_stream(user_id, time.time() + 60) for user_id in (1, 2)
+            ]
+            for stream in streams:
+                await anext(stream)
+            await asyncio.sleep(0)
+            pubsub.messages.put_nowait(
+                {"type": "pmessage", "channel": events.channel(2), "data": message}
+            )
+            self.assertEqual(await anext(streams[1]), events.format_event(message))
+            for stream in streams:
+                await stream.aclose()
+        self.assertEqual(get_async_redis.return_value.pubsub.call_count, 1)
+        self.assertEqual(pubsub.patterns, [events.channel("*")])
+        self.assertIsNone(events.get_subscriber().listener)
+
+
+class HabitSyncTest(CompletionTestCase):
+    def sync(self, since=None):
+        params = {"since": since} if since else {}
+        return self.client.get(reverse("habit-sync"), params)
+
+    def test_returns_only_changes_after_token(self):
+        other = Habit.objects.create(
+            user=self.user, place="Park", time="09:00:00", action="Run", duration=30
+        )
+        response = self.sync()
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(len(response.data["changed"]), 2)
+
+        Habit.objects.filter(pk__in=[self.habit.pk, other.pk]).update(
+            updated_at=timezone.now() - timedelta(minutes=1)
+        )
+        token = response.data["token"]
+        other.duration = 45
+        other.save()
+        habit_id = self.habit.pk
+        self.habit.delete()
+
+        response = self.sync(token)
+        self.assertFalse(response.data["reset"])
+        self.assertEqual([h["id"] for h in response.data["changed"]], [other.pk])
+        self.assertEqual(response.data["deleted"], [habit_id])
+
+    def test_invalid_token_is_rejected(self):
+        future = encode_token(timezone.now() + timedelta(days=1))
+        for token in ("yesterday", "-1", "9" * 20, "9" * 400, future):
+            with self.subTest(token=token):
+                self.assertEqual(
+                    self.sync(token).status_code, status.HTTP_400_BAD_REQUEST
+                )
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        self.user.delete()
+        self.assertFalse(HabitTombstone.objects.exists())
+
+
+class WeeklyDigestTest(CompletionTestCase):
+    def test_chunk_is_sent_over_one_connection(self):
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="testpassword"
+        )
+        Habit.objects.create(
+            user=other, place="Park", time="09:00:00", action="Run", duration=30
+        )
+        get_user_model().objects.create_user(
+            email="idle@example.com", password="testpassword"
+        )
+        today = timezone.localdate()
+        self.complete_on(today - timedelta(days=1))
+        self.complete_on(today)
+
+        chunks = list(digest.digest_user_chunks(chunk_size=1))
+        self.assertEqual(chunks, [[self.user.pk], [other.pk]])
+
+        with patch("habits.digest.get_connection", wraps=mail.get_connection) as conn:
+            sent = send_digest_chunk(sum(chunks, []), today.isoformat())
+        self.assertEqual(sent, 2)
+        self.assertEqual(conn.call_count, 1)
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [["stats@example.com"], ["other@example.com"]],
+        )
+        self.assertIn("Read (Home, 08:00): 2 из 7, серия 2", mail.outbox[0].body)
+
+    def test_only_connection_errors_are_retried(self):
+        today = timezone.localdate().isoformat()
+        connection = MagicMock()
+        connection.open.side_effect = smtplib.SMTPConnectError(421, "busy")
+        with patch("habits.digest.get_connection", return_value=connection):
+            result = send_digest_chunk.apply(args=([self.user.pk], today))
+        self.assertIsInstance(result.result, digest.DigestConnectionError)
+        self.assertEqual(connection.open.call_count, send_digest_chunk.max_retries + 1)
+        connection.send_messages.assert_not_called()
+
+        connection = MagicMock()
+        connection.send_messages.side_effect = ConnectionResetError
+        with patch("habits.digest.get_connection", return_value=connection):
+            result = send_digest_chunk.apply(args=([self.user.pk], today))
+        self.assertIsInstance(result.result, ConnectionResetError)
+        self.assertEqual(connection.send_messages.call_count, 1)
+
+
+class HabitScheduleTest(CompletionTestCase):
+    def test_expand_matches_per_habit_loop(self):
+        habits = [(1, dt_time(8, 0)), (3, dt_time(7, 30)), (7, dt_time(21, 15))]
+        start, end = date(2026, 10, 1), date(2026, 10, 31)
+        indices, moments = schedule.expand(
+            [frequency for frequency, _ in habits],
+            schedule.minutes_of_day([at for _, at in habits]),
+            start,
+            end,
+        )
+        self.assertEqual(
+            list(zip(moments.tolist(), indices.tolist())),
+            schedule.naive_expand(habits, start, end),
+        )
+        self.assertEqual(
+            schedule.occurrence_counts([1, 3, 7], start, end).tolist(), [31, 11, 4]
+        )
+
+    def test_occurrence_calendar(self):
+        Habit.objects.create(
+            user=self.user,
+            place="Park",
+            time="07:30:00",
+            action="Run",
+            duration=30,
+            frequency=7,
+        )
+        response = self.client.get(
+            reverse("habit-occurrences"), {"start": "2026-10-13", "end": "2026-10-19"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(len(results), 8)
+        self.assertEqual(results[0], {"habit": self.habit.pk, "at": "2026-10-13T08:00"})
+        weekly = [r["at"] for r in results if r["habit"] != self.habit.pk]
+        self.assertEqual(weekly, ["2026-10-18T07:30"])
+
+    def test_occurrence_range_is_limited(self):
+        response = self.client.get(
+            reverse("habit-occurrences"), {"start": "2026-01-01", "end": "2026-12-31"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_occurrences_reject_invalid_date(self):
+        response = self.client.get(
+            reverse("habit-occurrences"), {"start": "2026-02-30"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == "postgresql", "оценки строк есть только в PostgreSQL")
+class EstimatedCountPaginatorTest(CompletionTestCase):
+    def setUp(self):
+        super().setUp()
+        Habit.objects.bulk_create(
+            Habit(user=self.user, place="Home", time="09:00", action="Walk", duration=5)
+            for n in range(49)
+        )
+        self.habits = Habit.objects.order_by("pk")
+
+    def paginator(self, queryset):
+        paginator = EstimatedCountPaginator(queryset, 10)
+        paginator.exact_threshold = 0
+        return paginator
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Habit._meta.db_table}")
+
+    def test_unanalyzed_partitions_fall_back_to_count(self):
+        self.analyze()
+        # Так выглядит секция, которую ещё не анализировали; изменение
+        # откатится вместе с транзакцией теста.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE pg_class SET reltuples = -1 WHERE relname = %s",
+                [f"{Habit._meta.db_table}_p0"],
+            )
+        paginator = self.paginator(self.habits)
+        self.assertIsNone(paginator.estimate(self.habits))
+        self.assertEqual(paginator.count, 50)
+
+    def test_count_is_estimated_from_reltuples(self):
+        self.analyze()
+        with CaptureQueriesContext(connection) as queries:
+            count = self.paginator(self.habits).count
+        self.assertEqual(count, 50)
+        self.assertIn("pg_partition_tree", queries[0]["sql"])
+        self.assertNotIn("COUNT(*) AS", queries[0]["sql"])
+
+    def test_filtered_count_is_estimated_by_planner(self):
+        self.analyze()
+        habits = self.habits.filter(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            count = self.paginator(habits).count
+        self.assertGreater(count, 0)
+        self.assertTrue(queries[0]["sql"].startswith("EXPLAIN"))
+
+
+class HabitAdminTest(CompletionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="testpassword"
+        )
+        self.client.force_login(self.admin)
+
+    def add_linked_habits(self, count):
+        for n in range(count):
+            Habit.objects.create(
+                user=self.user,
+                place="Home",
+                time="09:00:00",
+                action=f"Walk {n}",
+                duration=10,
+                linked_habit=self.habit,
+            )
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("admin:habits_habit_changelist"), params or {}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_linked_habits(2)
+        _, few = self.changelist_queries()
+        self.add_linked_habits(5)
+        _, many = self.changelist_queries()
+        self.assertEqual(few, many)
+
+    def test_search_by_exact_owner_email(self):
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="testpassword"
+        )
+        Habit.objects.create(
+            user=other, place="Gym", time="18:00:00", action="Lift", duration=40
+        )
+        response, _ = self.changelist_queries({"q": "other@example.com"})
+        self.assertEqual(
+            [habit.action for habit in response.context["cl"].result_list], ["Lift"]
+        )
+        response, _ = self.changelist_queries({"q": "other"})
+        self.assertEqual(len(response.context["cl"].result_list), 0)
+        response, _ = self.changelist_queries({"q": str(self.habit.pk)})
+        self.assertEqual(list(response.context["cl"].result_list), [self.habit])
+
+
+class ReminderSimulationTest(TestCase):
+    def test_fake_telegram_limits_rate_and_records_deliveries(self):
+        server = simulation.FakeTelegram(latency=0, jitter=0, rate=2).start()
+        try:
+            results = [
+                send_telegram_message(
+                    "1", "Hi", done_keyboard(habit_id), api_url=server.url
+                )
+                for habit_id in (7, 8, 9)
+            ]
+        finally:
+            server.stop()
+        self.assertEqual([r["ok"] for r in results], [True, True, False])
+        self.assertEqual(results[2]["error_code"], 429)
+        self.assertEqual([h for _, h in server.deliveries], [7, 8])
+
+    def test_summary_counts_drops_duplicates_and_lag(self):
+        deliveries = [(10.5, 1), (11.0, 2), (12.0, 2), (13.0, 99)]
+        report = simulation.summarize([1, 2, 3], deliveries, 10.0, 12.0)
+        self.assertEqual(report["delivered"], 2)
+        self.assertEqual(report["dropped"], 1)
+        self.assertEqual(report["duplicates"], 1)
+        self.assertEqual(report["throughput_per_s"], 1.0)
+        self.assertEqual(report["lag_s"]["max"], 1.0)
+
+
+class ReminderSimulationRunTest(TransactionTestCase):
+    def test_simulation_does_not_touch_live_metrics(self):
+        user = get_user_model().objects.create_user(
+            email="simulation@example.com", password="testpassword"
+        )
+        user.profile.telegram_id = "42"
+        user.profile.save()
+        Habit.objects.create(
+            user=user, place="Home", time="08:00:00", action="Read", duration=20
+        )
+        sent = {"result": "sent"}
+        before = REGISTRY.get_sample_value("habit_reminders_total", sent) or 0
+        report = simulation.simulate(
+            timezone.localtime().replace(hour=8, minute=0),
+            workers=1,
+            latency=0,
+            jitter=0,
+            rate=0,
+        )
+        self.assertEqual(report["delivered"], 1)
+        self.assertEqual(report["reminders"], {"sent": 1, "retried": 0, "failed": 0})
+        self.assertEqual(
+            REGISTRY.get_sample_value("habit_reminders_total", sent) or 0, before
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE, RESPONSE_CACHE_MIN_SIZE=0)
+class ResponseCacheTest(CompletionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.credentials()
+        Habit.objects.create(
+            user=self.user,
+            place="Park",
+            time="07:00:00",
+            action="Run",
+            duration=30,
+            is_public=True,
+        )
+
+    def get_public(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("public-habits"), **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_gzip_variant_is_served_from_cache(self):
+        _, miss_queries = self.get_public(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        response, hit_queries = self.get_public(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertGreater(miss_queries, 0)
+        self.assertEqual(hit_queries, 0)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        habits = json.loads(gzip.decompress(response.content))
+        self.assertEqual([habit["action"] for habit in habits], ["Run"])
+
+        response, hit_queries = self.get_public(HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertEqual(hit_queries, 0)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(json.loads(response.content)[0]["action"], "Run")
+
+    def test_habit_change_invalidates_cached_feed(self):
+        self.get_public()
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.filter(action="Run").first().delete()
+        response, queries = self.get_public()
+        self.assertGreater(queries, 0)
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_evicted_version_does_not_serve_stale_entries(self):
+        self.get_public()
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.filter(action="Run").first().delete()
+        cache.delete(response_cache.version_key("habits"))
+        response, queries = self.get_public()
+        self.assertGreater(queries, 0)
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.get_public()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        _, queries = self.get_public()
+        self.assertGreater(queries, 0)
+
+    def test_cache_errors_fail_open(self):
+        with patch.object(cache, "get", side_effect=ConnectionError("down")):
+            response, queries = self.get_public()
+        self.assertGreater(queries, 0)
+        self.assertEqual(json.loads(response.content)[0]["action"], "Run")
+
+
+class SeedHabitsTest(TestCase):
+    def test_seeds_users_profiles_and_linked_habits(self):
+        call_command(
+            "seed_habits",
+            users=20,
+            habits=120,
+            chunk_size=8,
+            seed=1,
+            linked_ratio=1.0,
+            stdout=StringIO(),
+        )
+        users = get_user_model().objects.filter(email__startswith="seed-")
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(Profile.objects.filter(user__in=users).count(), 20)
+        habits = Habit.objects.filter(user__in=users)
+        self.assertEqual(habits.count(), 120)
+        linked = habits.filter(linked_habit__isnull=False).select_related(
+            "linked_habit"
+        )
+        self.assertTrue(linked.exists())
+        for habit in linked:
+            self.assertTrue(habit.linked_habit.is_pleasant)
+            self.assertEqual(habit.linked_habit.user_id, habit.user_id)
@@ -1,15 +1,38 @@
 from django.urls import path
 
-from .views import (HabitCreateView, HabitDeleteView, HabitListView,
-                    HabitUpdateView, PublicHabitsView, UserRegistrationView,
-                    register_telegram)
+from .views import (HabitCalendarView, HabitCompleteView, HabitCopyView,
+                    HabitCreateView, HabitDeleteView, HabitListView,
+                    HabitOccurrencesView, HabitRankView, HabitStatsView,
+                    HabitSyncView, HabitUpdateView, LeaderboardView,
+                    PublicHabitsView, UserRegistrationView, habit_events,
+                    register_telegram, telegram_webhook)
 
 urlpatterns = [
     path("habits/", HabitListView.as_view(), name="list-habits"),
     path("habits/create/", HabitCreateView.as_view(), name="create-habit"),
+    path("habits/events/", habit_events, name="habit-events"),
+    path("habits/sync/", HabitSyncView.as_view(), name="habit-sync"),
+    path(
+        "habits/occurrences/",
+        HabitOccurrencesView.as_view(),
+        name="habit-occurrences",
+    ),
+    path("habits/calendar/", HabitCalendarView.as_view(), name="habit-calendar"),
     path("habits/public/", PublicHabitsView.as_view(), name="public-habits"),
+    path(
+        "habits/public/leaderboard/",
+        LeaderboardView.as_view(),
+        name="public-habits-leaderboard",
+    ),
+    path("habits/<int:pk>/copy/", HabitCopyView.as_view(), name="habit-copy"),
+    path("habits/<int:pk>/rank/", HabitRankView.as_view(), name="habit-rank"),
     path("habits/<int:pk>/update/", HabitUpdateView.as_view(), name="habit-update"),
     path("habits/<int:pk>/delete/", HabitDeleteView.as_view(), name="habit-delete"),
+    path(
+        "habits/<int:pk>/complete/", HabitCompleteView.as_view(), name="habit-complete"
+    ),
+    path("habits/<int:pk>/stats/", HabitStatsView.as_view(), name="habit-stats"),
     path("users/register/", UserRegistrationView.as_view(), name="user-register"),
     path("telegram/register/", register_telegram, name="register_telegram"),
+    path("telegram/webhook/", telegram_webhook, name="telegram-webhook"),
 ]
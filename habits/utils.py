@@ -1,24 +1,56 @@
+import asyncio
+import json
 import os
+import weakref
+from functools import lru_cache
 
+import redis
+import redis.asyncio
 import requests
+from django.conf import settings
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_TIMEOUT = 10
 
 
-def send_telegram_message(chat_id, message):
+def send_telegram_message(chat_id, message, reply_markup=None, api_url=None):
     """Отправляет сообщение в Telegram.
 
     Аргументы:
         chat_id (str): Telegram ID получателя.
         message (str): Текст сообщения.
+        reply_markup (dict): Необязательная клавиатура (например, inline-кнопки).
+        api_url (str): Адрес Bot API; по умолчанию settings.TELEGRAM_API_URL.
 
     Возвращает:
         dict: Ответ от Telegram API.
     """
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    api_url = api_url or settings.TELEGRAM_API_URL
+    url = f"{api_url}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     data = {
         "chat_id": chat_id,
         "text": message,
     }
-    response = requests.post(url, data=data)
+    if reply_markup:
+        data["reply_markup"] = json.dumps(reply_markup)
+    response = requests.post(url, data=data, timeout=TELEGRAM_TIMEOUT)
     return response.json()
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    """Возвращает общий клиент Redis (пул соединений на процесс)."""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """Возвращает асинхронный клиент Redis, привязанный к текущему event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        _async_clients[loop] = client
+    return client
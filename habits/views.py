@@ -1,7 +1,18 @@
 import json
+import logging
+from datetime import timedelta
 
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
 from django.views.decorators.csrf import csrf_exempt
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status, viewsets
@@ -10,12 +21,22 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
 
+from . import events, leaderboard, schedule
+from .bitmaps import count_days, encode_days
 from .filters import HabitFilter
-from .models import Habit
-from .serializers import HabitSerializer, UserRegistrationSerializer
+from .models import Habit, HabitCalendar, HabitStats
+from .serializers import (HabitSerializer, HabitStatsSerializer,
+                          UserRegistrationSerializer)
+from .stats import record_completion
+from .sync import InvalidSyncToken, changes_since
+from .webhook import enqueue_completion, parse_done_callback
 from django.http import HttpResponse
 
+logger = logging.getLogger(__name__)
+
 
 class HabitViewSet(viewsets.ModelViewSet):
     """ViewSet для работы с привычками (CRUD).
@@ -102,6 +123,8 @@ class HabitUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Habit.objects.none()
         return Habit.objects.filter(user=self.request.user)
 
 
@@ -115,6 +138,188 @@ class HabitDeleteView(DestroyAPIView):
         return Habit.objects.filter(user=self.request.user)
 
 
+class HabitCompleteView(APIView):
+    """APIView для отметки выполнения привычки.
+
+    Метод:
+        - post: Сохраняет выполнение и обновляет статистику привычки.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        habit = get_object_or_404(Habit, pk=pk, user=request.user)
+        record_completion(habit)
+        stats = HabitStats.objects.select_related("habit").get(habit=habit)
+        return Response(
+            HabitStatsSerializer(stats).data, status=status.HTTP_201_CREATED
+        )
+
+
+class HabitStatsView(APIView):
+    """APIView для получения статистики привычки.
+
+    Метод:
+        - get: Возвращает заранее посчитанную статистику одной строкой.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        stats = (
+            HabitStats.objects.select_related("habit")
+            .filter(habit_id=pk, habit__user=request.user)
+            .first()
+        )
+        if stats is None:
+            habit = get_object_or_404(Habit, pk=pk, user=request.user)
+            stats = HabitStats(habit=habit)
+        return Response(HabitStatsSerializer(stats).data, status=status.HTTP_200_OK)
+
+
+class HabitCalendarView(APIView):
+    """APIView для календаря выполнений всех привычек пользователя за год.
+
+    Параметры запроса:
+        - year: Год (по умолчанию текущий).
+        - start, end: Необязательный диапазон дат для подсчёта выполнений.
+
+    Метод:
+        - get: Возвращает для каждой привычки битовую карту года в base64
+          и число выполнений в диапазоне.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            year = int(request.query_params.get("year", timezone.localdate().year))
+        except ValueError:
+            return Response(
+                {"error": "year must be an integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start = parse_date(request.query_params.get("start", "") or "")
+            end = parse_date(request.query_params.get("end", "") or "")
+        except ValueError:
+            return Response(
+                {"error": "start and end must be valid dates"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (start and start.year != year) or (end and end.year != year):
+            return Response(
+                {"error": "start and end must be within year"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        calendars = dict(
+            HabitCalendar.objects.filter(
+                habit__user=request.user, year=year
+            ).values_list("habit_id", "days")
+        )
+        habit_ids = Habit.objects.filter(user=request.user).values_list("id", flat=True)
+        results = [
+            {
+                "habit": habit_id,
+                "days": encode_days(calendars.get(habit_id)),
+                "count": count_days(calendars.get(habit_id), start, end),
+            }
+            for habit_id in habit_ids
+        ]
+        return Response({"year": year, "results": results}, status=status.HTTP_200_OK)
+
+
+class HabitOccurrencesView(APIView):
+    """APIView для календаря срабатываний всех привычек пользователя.
+
+    Параметры запроса:
+        - start, end: Диапазон дат включительно (по умолчанию — ближайшие
+          7 дней, не больше schedule.MAX_RANGE_DAYS дней).
+
+    Метод:
+        - get: Возвращает моменты срабатывания в местном времени сервера,
+          упорядоченные по времени.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            start = parse_date(request.query_params.get("start", "") or "")
+            end = parse_date(request.query_params.get("end", "") or "")
+        except ValueError:
+            return Response(
+                {"error": "start and end must be valid dates"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start = start or timezone.localdate()
+        end = end or start + timedelta(days=6)
+        if end < start or (end - start).days >= schedule.MAX_RANGE_DAYS:
+            return Response(
+                {
+                    "error": "end must be after start and within "
+                    f"{schedule.MAX_RANGE_DAYS} days"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        habits = list(
+            Habit.objects.filter(user=request.user).values_list(
+                "pk", "frequency", "time"
+            )
+        )
+        habit_ids = [habit[0] for habit in habits]
+        indices, moments = schedule.expand(
+            [habit[1] for habit in habits],
+            schedule.minutes_of_day([habit[2] for habit in habits]),
+            start,
+            end,
+        )
+        results = [
+            {"habit": habit_ids[index], "at": at}
+            for index, at in zip(indices.tolist(), schedule.isoformat(moments))
+        ]
+        return Response(
+            {
+                "timezone": settings.TIME_ZONE,
+                "start": start,
+                "end": end,
+                "results": results,
+            }
+        )
+
+
+class HabitSyncView(APIView):
+    """APIView для дельта-синхронизации привычек офлайн-клиентов.
+
+    Параметры запроса:
+        - since: Токен из предыдущего ответа (без него — полный список).
+
+    Метод:
+        - get: Возвращает привычки, изменённые после since, ID удалённых
+          привычек и новый токен. При reset=true клиент заменяет локальные
+          данные полученным списком.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            changes = changes_since(request.user, request.query_params.get("since"))
+        except InvalidSyncToken:
+            return Response(
+                {"error": "Invalid since token"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {
+                "changed": HabitSerializer(changes["changed"], many=True).data,
+                "deleted": changes["deleted"],
+                "token": changes["token"],
+                "reset": changes["reset"],
+            }
+        )
+
+
 class PublicHabitsView(APIView):
     """APIView для получения публичных привычек.
 
@@ -130,6 +335,101 @@ class PublicHabitsView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class HabitCopyView(APIView):
+    """APIView для копирования публичной привычки себе.
+
+    Метод:
+        - post: Создаёт приватную копию публичной привычки у текущего
+          пользователя и повышает её место в рейтинге.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        source = get_object_or_404(Habit, pk=pk, is_public=True)
+        habit = Habit.objects.create(
+            user=request.user,
+            place=source.place,
+            time=source.time,
+            action=source.action,
+            is_pleasant=source.is_pleasant,
+            frequency=source.frequency,
+            reward=source.reward,
+            duration=source.duration,
+            copied_from=source,
+        )
+        transaction.on_commit(lambda: leaderboard.bump(source.pk))
+        return Response(HabitSerializer(habit).data, status=status.HTTP_201_CREATED)
+
+
+class LeaderboardView(APIView):
+    """APIView для рейтинга самых популярных публичных привычек.
+
+    Параметры запроса:
+        - limit: Размер рейтинга (по умолчанию 10, не больше 100).
+
+    Метод:
+        - get: Возвращает первые позиции рейтинга из Redis.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 100)
+        except ValueError:
+            limit = 10
+        try:
+            entries = leaderboard.top(max(limit, 1))
+        except redis.RedisError as e:
+            logger.warning("Leaderboard unavailable: %s", e)
+            return Response(
+                {"error": "Leaderboard is temporarily unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        habits = Habit.objects.filter(is_public=True).in_bulk(
+            [habit_id for habit_id, _ in entries]
+        )
+        results = [
+            {
+                "rank": position,
+                "score": score,
+                "habit": HabitSerializer(habits[habit_id]).data,
+            }
+            for position, (habit_id, score) in enumerate(entries, start=1)
+            if habit_id in habits
+        ]
+        return Response(results, status=status.HTTP_200_OK)
+
+
+class HabitRankView(APIView):
+    """APIView для места публичной привычки в рейтинге.
+
+    Метод:
+        - get: Возвращает место и счёт привычки.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        try:
+            position = leaderboard.rank(pk)
+        except redis.RedisError as e:
+            logger.warning("Leaderboard unavailable: %s", e)
+            return Response(
+                {"error": "Leaderboard is temporarily unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        if position is None:
+            return Response(
+                {"error": "Habit is not ranked"}, status=status.HTTP_404_NOT_FOUND
+            )
+        rank, score = position
+        return Response(
+            {"habit": pk, "rank": rank, "score": score}, status=status.HTTP_200_OK
+        )
+
+
 class RegistrationView(APIView):
     permission_classes = [AllowAny]
 
@@ -225,3 +525,83 @@ def register_telegram(request):
             return JsonResponse({"error": "Invalid JSON body"}, status=400)
 
     return JsonResponse({"error": "Invalid request method"}, status=405)
+
+
+@csrf_exempt
+async def telegram_webhook(request):
+    """Приём обновлений Telegram (нажатия кнопки «Выполнено»).
+
+    Проверяет секрет из заголовка X-Telegram-Bot-Api-Secret-Token, кладёт
+    отметку в буфер Redis и сразу отвечает, подтверждая callback-query
+    в теле ответа. В базу отметки записывает задача flush_completion_buffer.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not settings.TELEGRAM_WEBHOOK_SECRET or not constant_time_compare(
+        secret, settings.TELEGRAM_WEBHOOK_SECRET
+    ):
+        return JsonResponse({"error": "Invalid secret token"}, status=403)
+
+    try:
+        update = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    entry = parse_done_callback(update)
+    if entry is None:
+        return JsonResponse({"ok": True})
+
+    await enqueue_completion(entry)
+    return JsonResponse(
+        {
+            "method": "answerCallbackQuery",
+            "callback_query_id": entry["callback_query_id"],
+            "text": "Отмечено!",
+        }
+    )
+
+
+async def authenticate_stream(request):
+    """Проверяет JWT из заголовка Authorization.
+
+    Токен в строке запроса не принимается: он попал бы в журналы доступа.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None, None
+    try:
+        token = authenticator.get_validated_token(raw_token)
+        user = await sync_to_async(authenticator.get_user)(token)
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    return user, token
+
+
+async def habit_events(request):
+    """Поток Server-Sent Events с изменениями привычек текущего пользователя.
+
+    События habit.created, habit.updated и habit.deleted приходят из Redis
+    pub/sub. Ожидание событий не занимает поток только под ASGI (сервис
+    events в docker-compose); под WSGI каждый поток держал бы воркер
+    gunicorn до истечения токена, поэтому там эндпоинт отвечает 404.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Event stream is not served here"}, status=404)
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+
+    user, token = await authenticate_stream(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    response = StreamingHttpResponse(
+        events.event_stream(user.pk, token["exp"]),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,220 @@
+import json
+import logging
+import time
+import uuid
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Habit, Profile
+from .stats import record_completions
+from .utils import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+COMPLETION_BUFFER_KEY = "habits:telegram:completions"
+DONE_CALLBACK_PREFIX = "done:"
+# Забранные из буфера пачки лежат в отдельных списках до записи в базу;
+# в ZSET — момент, когда пачку забрали.
+CLAIMS_KEY = f"{COMPLETION_BUFFER_KEY}:claims"
+CLAIM_TIMEOUT = 300
+
+CLAIM_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+    redis.call('ZADD', KEYS[3], ARGV[2], KEYS[2])
+end
+return items
+"""
+# Пачку, которую не удалось записать, повторяем после CLAIM_TIMEOUT не более
+# MAX_BATCH_RETRIES раз, а затем перекладываем в DEAD_LETTER_KEY для разбора.
+ATTEMPTS_KEY = f"{COMPLETION_BUFFER_KEY}:attempts"
+DEAD_LETTER_KEY = f"{COMPLETION_BUFFER_KEY}:dead"
+MAX_BATCH_RETRIES = 3
+
+RECLAIM_SCRIPT = """
+local claimed_at = redis.call('ZSCORE', KEYS[2], KEYS[1])
+if not claimed_at or tonumber(claimed_at) > tonumber(ARGV[1]) then
+    return false
+end
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+local retries = redis.call('HINCRBY', KEYS[3], KEYS[1], 1)
+if retries > tonumber(ARGV[3]) then
+    if #items > 0 then
+        redis.call('RPUSH', KEYS[4], unpack(items))
+    end
+    redis.call('DEL', KEYS[1])
+    redis.call('ZREM', KEYS[2], KEYS[1])
+    redis.call('HDEL', KEYS[3], KEYS[1])
+    return #items
+end
+redis.call('ZADD', KEYS[2], ARGV[2], KEYS[1])
+return items
+"""
+
+
+def done_keyboard(habit_id):
+    """Inline-клавиатура с кнопкой «Выполнено» для напоминания."""
+    return {
+        "inline_keyboard": [
+            [
+                {
+                    "text": "Выполнено",
+                    "callback_data": f"{DONE_CALLBACK_PREFIX}{habit_id}",
+                }
+            ]
+        ]
+    }
+
+
+def parse_done_callback(update):
+    """Извлекает отметку о выполнении из callback-query обновления Telegram.
+
+    Возвращает:
+        dict | None: Запись для буфера или None, если это не кнопка «Выполнено».
+    """
+    callback = update.get("callback_query") or {}
+    data = callback.get("data") or ""
+    sender = callback.get("from") or {}
+    if not data.startswith(DONE_CALLBACK_PREFIX) or "id" not in sender:
+        return None
+    try:
+        habit_id = int(data.removeprefix(DONE_CALLBACK_PREFIX))
+    except ValueError:
+        return None
+    return {
+        "callback_query_id": callback.get("id"),
+        "telegram_id": str(sender["id"]),
+        "habit_id": habit_id,
+        "completed_at": timezone.now().isoformat(),
+    }
+
+
+async def enqueue_completion(entry):
+    """Кладёт отметку в буфер Redis, не обращаясь к базе данных."""
+    await get_async_redis().rpush(COMPLETION_BUFFER_KEY, json.dumps(entry))
+
+
+def drain_buffer(batch_size):
+    """Атомарно переносит из буфера до ``batch_size`` записей в список-пачку.
+
+    Пачку нужно подтвердить ack_batch() после записи в базу; неподтверждённую
+    пачку (запись упала или упал воркер) снова выдаст reclaim_stale_batches().
+
+    Возвращает:
+        tuple: (ключ пачки, записи).
+    """
+    claim_key = f"{COMPLETION_BUFFER_KEY}:processing:{uuid.uuid4().hex}"
+    raw_entries = get_redis().register_script(CLAIM_SCRIPT)(
+        keys=[COMPLETION_BUFFER_KEY, claim_key, CLAIMS_KEY],
+        args=[batch_size, time.time()],
+    )
+    return claim_key, raw_entries
+
+
+def ack_batch(claim_key):
+    """Удаляет пачку, записанную в базу."""
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.delete(claim_key)
+    pipe.zrem(CLAIMS_KEY, claim_key)
+    pipe.hdel(ATTEMPTS_KEY, claim_key)
+    pipe.execute()
+
+
+def reclaim_stale_batches(timeout=CLAIM_TIMEOUT, max_retries=MAX_BATCH_RETRIES):
+    """Повторно забирает пачки, не подтверждённые за ``timeout`` секунд.
+
+    Каждая выдача пачки повторно считается попыткой; пачку, исчерпавшую
+    ``max_retries`` попыток, переносит в DEAD_LETTER_KEY вместо повтора.
+    Если воркер упал после фиксации транзакции, но до ack_batch(), такие
+    отметки запишутся повторно: доставка «хотя бы один раз».
+
+    Возвращает:
+        Iterator[tuple]: (ключ пачки, записи) для каждой пачки к повтору.
+    """
+    client = get_redis()
+    reclaim = client.register_script(RECLAIM_SCRIPT)
+    cutoff = time.time() - timeout
+    for claim_key in client.zrangebyscore(CLAIMS_KEY, "-inf", cutoff):
+        result = reclaim(
+            keys=[claim_key, CLAIMS_KEY, ATTEMPTS_KEY, DEAD_LETTER_KEY],
+            args=[cutoff, time.time(), max_retries],
+        )
+        if isinstance(result, int):
+            logger.error(
+                "Moved %d buffered completions from %s to %s after %d retries",
+                result,
+                claim_key,
+                DEAD_LETTER_KEY,
+                max_retries,
+            )
+        elif result:
+            yield claim_key, result
+
+
+def parse_buffered_completion(raw):
+    """Разбирает запись буфера, проверяя поля, которые кладёт parse_done_callback().
+
+    Возвращает:
+        dict | None: Запись с ``completed_at`` в виде datetime или None,
+        если запись повреждена.
+    """
+    try:
+        entry = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(entry, dict):
+        return None
+    telegram_id = entry.get("telegram_id")
+    habit_id = entry.get("habit_id")
+    if not isinstance(telegram_id, str) or not telegram_id:
+        return None
+    if not isinstance(habit_id, int) or isinstance(habit_id, bool):
+        return None
+    try:
+        completed_at = parse_datetime(entry.get("completed_at") or "")
+    except (TypeError, ValueError):
+        return None
+    if completed_at is None:
+        return None
+    return {**entry, "completed_at": completed_at}
+
+
+def apply_buffered_completions(raw_entries):
+    """Записывает пачку отметок из буфера в базу одной транзакцией.
+
+    Повреждённые записи, отметки от чужих Telegram-аккаунтов, на удалённые
+    привычки и повторы одного callback-query отбрасываются.
+
+    Возвращает:
+        int: Число сохранённых выполнений.
+    """
+    entries = {}
+    for raw in raw_entries:
+        entry = parse_buffered_completion(raw)
+        if entry is None:
+            logger.warning("Skipping malformed buffered completion: %r", raw)
+            continue
+        entries.setdefault(entry.get("callback_query_id") or raw, entry)
+    if not entries:
+        return 0
+
+    owners = dict(
+        Profile.objects.filter(
+            telegram_id__in={entry["telegram_id"] for entry in entries.values()}
+        ).values_list("telegram_id", "user_id")
+    )
+    habits = Habit.objects.in_bulk({entry["habit_id"] for entry in entries.values()})
+
+    completions = []
+    for entry in entries.values():
+        habit = habits.get(entry["habit_id"])
+        if habit is None or owners.get(entry["telegram_id"]) != habit.user_id:
+            continue
+        completions.append((habit, entry["completed_at"]))
+
+    if completions:
+        record_completions(completions)
+    return len(completions)
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Запускает команду сервиса с собственным каталогом метрик Prometheus:
+#   prometheus-exec.sh <сервис> <команда> [аргументы...]
+# Каталог $PROMETHEUS_METRICS_ROOT/<сервис> очищается при каждом старте,
+# чтобы файлы процессов прошлых запусков не завышали счётчики. У каждого
+# контейнера свой каталог: PID в разных контейнерах совпадают.
+set -e
+service="$1"
+shift
+export PROMETHEUS_METRICS_ROOT="${PROMETHEUS_METRICS_ROOT:-/var/run/prometheus}"
+export PROMETHEUS_MULTIPROC_DIR="$PROMETHEUS_METRICS_ROOT/$service"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+exec "$@"
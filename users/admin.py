@@ -0,0 +1,42 @@
+from django.contrib import admin
+
+from habit_tracker.paginators import EstimatedCountPaginator
+
+from .models import User
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    """Список пользователей для поиска по email и выбора в полях привычек.
+
+    Пароль здесь не редактируется; поиск — только точный email или ID.
+    """
+
+    list_display = ("id", "email", "is_active", "is_staff")
+    fields = (
+        "email",
+        "phone",
+        "city",
+        "avatar",
+        "telegram_id",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+        "last_login",
+        "date_joined",
+    )
+    readonly_fields = ("last_login", "date_joined")
+    search_fields = ("id", "email")
+    search_help_text = "ID или точный email"
+    sortable_by = ("id",)
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        return queryset.filter(email=term), False
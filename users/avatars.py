@@ -0,0 +1,113 @@
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from kombu.exceptions import OperationalError
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = "users/avatars/thumbs"
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def thumbnail_name(user_id, avatar_name, size, extension):
+    """Детерминированный путь миниатюры: новая аватарка — новые URL.
+
+    Путь строится из ID пользователя и хэша полного имени аватарки, так что
+    me.jpg и me.png разных (или одного) пользователей не пересекаются.
+    """
+    digest = hashlib.sha256(avatar_name.encode()).hexdigest()[:16]
+    return f"{THUMBNAIL_DIR}/{user_id}/{digest}-{size}.{extension}"
+
+
+def thumbnail_names(user_id, avatar_name):
+    """Пути всех миниатюр в порядке их создания в make_thumbnails()."""
+    return [
+        thumbnail_name(user_id, avatar_name, size, extension)
+        for size in settings.AVATAR_THUMBNAIL_SIZES
+        for extension in FORMATS
+    ]
+
+
+def thumbnails_ready(avatar):
+    """Созданы ли миниатюры: make_thumbnails() пишет последней файл,
+    который проверяется здесь."""
+    return default_storage.exists(thumbnail_names(avatar.instance.pk, avatar.name)[-1])
+
+
+def thumbnail_urls(avatar):
+    """URL миниатюр вида {"64": {"webp": ..., "jpeg": ...}}.
+
+    None — аватарки нет или миниатюры ещё не созданы.
+    """
+    if not avatar or not thumbnails_ready(avatar):
+        return None
+    return {
+        str(size): {
+            extension: default_storage.url(
+                thumbnail_name(avatar.instance.pk, avatar.name, size, extension)
+            )
+            for extension in FORMATS
+        }
+        for size in settings.AVATAR_THUMBNAIL_SIZES
+    }
+
+
+def render_thumbnail(image, size, image_format):
+    """Квадратная миниатюра без EXIF и прочих метаданных."""
+    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(
+        buffer,
+        image_format,
+        quality=settings.AVATAR_THUMBNAIL_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def make_thumbnails(avatar):
+    """Создаёт миниатюры всех размеров и форматов; возвращает их пути."""
+    with avatar.open("rb") as source, Image.open(source) as image:
+        # Поворот по EXIF применяется до того, как метаданные будут отброшены.
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        names = []
+        for size in settings.AVATAR_THUMBNAIL_SIZES:
+            for extension, image_format in FORMATS.items():
+                name = thumbnail_name(avatar.instance.pk, avatar.name, size, extension)
+                content = render_thumbnail(image, size, image_format)
+                default_storage.delete(name)
+                names.append(default_storage.save(name, ContentFile(content)))
+    return names
+
+
+def delete_thumbnails(user_id, avatar_name):
+    for name in thumbnail_names(user_id, avatar_name):
+        default_storage.delete(name)
+
+
+def schedule_avatar_processing(user, replaced=None):
+    """Ставит обработку аватарки в очередь после фиксации транзакции.
+
+    replaced — имя прежней аватарки, миниатюры которой задача удалит.
+    """
+    from .tasks import process_avatar
+
+    avatar_name = user.avatar.name or None
+    if replaced == avatar_name:
+        replaced = None
+    if avatar_name is None and replaced is None:
+        return
+
+    def enqueue():
+        try:
+            process_avatar.delay(user.pk, avatar_name, replaced)
+        except OperationalError as e:
+            logger.error("Could not enqueue avatar processing for %s: %s", user.pk, e)
+
+    transaction.on_commit(enqueue)
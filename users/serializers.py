@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from habit_tracker.timing import TimedSerializerMixin
+
+from .avatars import schedule_avatar_processing, thumbnail_urls
+
 User = get_user_model()
 
 
@@ -22,13 +26,30 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             city=validated_data.get("city", ""),
             avatar=validated_data.get("avatar", None),
         )
+        schedule_avatar_processing(user)
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Сериализатор для просмотра и обновления профиля пользователя."""
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Сериализатор для просмотра и обновления профиля пользователя.
+
+    Миниатюры аватарки создаются в фоне; клиентам следует загружать их,
+    а не оригинал. Пока они не готовы, avatar_thumbnails равно null.
+    """
+
+    avatar_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ("id", "email", "phone", "city", "avatar")
+        fields = ("id", "email", "phone", "city", "avatar", "avatar_thumbnails")
         read_only_fields = ("email",)
+
+    def get_avatar_thumbnails(self, obj):
+        return thumbnail_urls(obj.avatar)
+
+    def update(self, instance, validated_data):
+        replaced = instance.avatar.name or None
+        user = super().update(instance, validated_data)
+        if "avatar" in validated_data:
+            schedule_avatar_processing(user, replaced)
+        return user
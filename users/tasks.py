@@ -0,0 +1,24 @@
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from .avatars import delete_thumbnails, make_thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def process_avatar(user_id, avatar_name, replaced=None):
+    """Создаёт миниатюры аватарки пользователя и удаляет миниатюры прежней.
+
+    Если аватарку успели заменить, новые миниатюры не создаются: это
+    сделает задача, поставленная при следующей загрузке.
+    """
+    user = get_user_model().objects.filter(pk=user_id).first()
+    current = user is not None and (user.avatar.name or None) == avatar_name
+    if current and avatar_name:
+        names = make_thumbnails(user.avatar)
+        logger.info("Created %s avatar thumbnails for user %s", len(names), user_id)
+    if replaced:
+        delete_thumbnails(user_id, replaced)
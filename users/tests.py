@@ -0,0 +1,100 @@
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from users.tasks import process_avatar
+
+
+class AvatarProcessingTest(APITestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.user = User.objects.create_user(
+            email="avatar@example.com", password="testpassword"
+        )
+        self.login(self.user)
+
+    def upload(self, name):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"
+        Image.new("RGB", (800, 600), "red").save(buffer, "JPEG", exif=exif)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("user-profile"),
+                {"avatar": SimpleUploadedFile(name, buffer.getvalue())},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        return response
+
+    def login(self, user):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+        self.user = user
+
+    def thumbnails(self):
+        return self.client.get(reverse("user-profile")).data["avatar_thumbnails"]
+
+    def test_thumbnails_are_generated_without_metadata(self):
+        with patch.object(process_avatar, "delay") as delay:
+            response = self.upload("me.jpg")
+        self.assertIsNone(response.data["avatar_thumbnails"])
+
+        process_avatar(*delay.call_args.args)
+        urls = self.thumbnails()
+        self.assertEqual(set(urls), {"64", "256"})
+        name = urls["64"]["webp"].removeprefix(default_storage.base_url)
+        with default_storage.open(name) as thumbnail, Image.open(thumbnail) as image:
+            self.assertEqual(image.size, (64, 64))
+            self.assertEqual(image.format, "WEBP")
+            self.assertFalse(image.getexif())
+
+    def test_replaced_avatar_thumbnails_are_deleted(self):
+        with patch.object(process_avatar, "delay") as delay:
+            self.upload("first.jpg")
+            process_avatar(*delay.call_args.args)
+            old = [
+                url.removeprefix(default_storage.base_url)
+                for formats in self.thumbnails().values()
+                for url in formats.values()
+            ]
+            self.upload("second.jpg")
+            process_avatar(*delay.call_args.args)
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+        self.assertNotEqual(self.thumbnails()["64"]["webp"], old[0])
+
+    def test_avatars_differing_only_in_extension_do_not_share_thumbnails(self):
+        first = self.user
+        second = User.objects.create_user(
+            email="other@example.com", password="testpassword"
+        )
+        urls = {}
+        with patch.object(process_avatar, "delay") as delay:
+            for user, name in ((first, "me.jpg"), (second, "me.png")):
+                self.login(user)
+                self.upload(name)
+                process_avatar(*delay.call_args.args)
+                urls[user.pk] = self.thumbnails()
+            self.login(first)
+            self.upload("new.jpg")
+            process_avatar(*delay.call_args.args)
+
+        self.assertNotEqual(urls[first.pk], urls[second.pk])
+        for formats in urls[second.pk].values():
+            for url in formats.values():
+                name = url.removeprefix(default_storage.base_url)
+                self.assertTrue(default_storage.exists(name))